@@ -66,17 +66,28 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': 60 * 60,
         'task': 'scraper.services.scrape_handles_info',
     },
-    # Stats services cronjobs.
+    # Stats services cronjobs. Statistics are updated as submissions come,
+    # and fully recomputed (to reconcile them) once in a while.
+    'update-statistics': {
+        'schedule': 10,
+        'task': 'stats.services.update_statistics',
+    },
     'compute-user-statistics': {
-        'schedule': 10 * 60,
+        'schedule': 60 * 60,
         'task': 'stats.services.compute_user_statistics',
     },
     'compute-task-statistics': {
-        'schedule': 10 * 60,
+        'schedule': 60 * 60,
         'task': 'stats.services.compute_task_statistics',
     },
     'compute-ladder-statistics': {
-        'schedule': 10 * 60,
+        'schedule': 60 * 60,
         'task': 'stats.services.compute_ladder_statistics',
     },
+    # Best submissions are kept up to date as they are written: this repairs
+    # the ones missed (e.g. of deleted submissions).
+    'compute-best-submissions': {
+        'schedule': 60 * 60,
+        'task': 'stats.services.compute_best_submissions',
+    },
 }
@@ -164,6 +164,63 @@ FORM_RENDERER = 'django.forms.renderers.TemplatesSetting'
 CELERY_BROKER_URL = os.environ['REDIS_URL']
 USE_CELERY = True
 
+# Scraper HTTP settings. Options under 'default' apply to all judges,
+# unless overridden under the judge id (e.g. 'cf': {'POOL_SIZE': 4}).
+SCRAPER_HTTP = {
+    'default': {
+        'POOL_SIZE': 10,
+        'CONNECT_TIMEOUT': 10,
+        'READ_TIMEOUT': 60,
+        # Number of tasks/handles scraped concurrently.
+        'WORKERS': 4,
+        # Token bucket shared by all processes (through Redis): RATE requests
+        # per second on average, with bursts of up to BURST requests.
+        'RATE': 5,
+        'BURST': 10,
+        # Failed requests are retried after exponentially growing delays
+        # (in seconds), starting at BACKOFF_BASE and capped at BACKOFF_CAP.
+        'BACKOFF_BASE': 1,
+        'BACKOFF_CAP': 60,
+        # Cached pages (e.g. task statements) are reused for CACHE_TTL seconds,
+        # then revalidated with the judge (ETag / Last-Modified) if possible.
+        'CACHE_TTL': 24 * 60 * 60,
+        # Incremental scrapes also re-scrape submissions up to WATERMARK_OVERLAP
+        # seconds older than the newest one scraped before.
+        'WATERMARK_OVERLAP': 60 * 60,
+        # Scrapers (and their bootstrap state, like CSRF tokens) are reused
+        # by the whole process for SCRAPER_TTL seconds.
+        'SCRAPER_TTL': 60 * 60,
+        # Handles/tasks of scraped submissions are resolved from an in-process
+        # cache, refreshed after RESOLUTION_TTL seconds (or when they change).
+        'RESOLUTION_TTL': 10 * 60,
+        # Judges polled for recent submissions (concurrently) give up after
+        # RECENT_SUBMISSIONS_TIMEOUT seconds, so that the next poll is not late.
+        'RECENT_SUBMISSIONS_TIMEOUT': 25,
+    },
+    # Codeforces API allows one call every two seconds.
+    'cf': {
+        'RATE': 0.5,
+        'BURST': 1,
+    },
+    # Google Translate quotas are per minute.
+    'translate': {
+        'RATE': 1,
+        'BURST': 5,
+        'BACKOFF_BASE': 15,
+        'BACKOFF_CAP': 120,
+    },
+}
+
+# Directory of the on-disk cache of scraped pages.
+SCRAPER_CACHE_DIR = os.path.join(BASE_DIR, '..', 'cache', 'scraper')
+
+# Parser backend of the scrapers ('lxml' or 'html.parser').
+# Defaults to lxml, if installed.
+SCRAPER_HTML_PARSER = None
+
+# Directory of the recorded judge responses replayed by benchmark_scrapers.
+SCRAPER_FIXTURES_DIR = os.path.join(BASE_DIR, '..', 'fixtures', 'scraper')
+
 ELASTICSEARCH_DSL = {
     'default': {
         'hosts': os.environ['BONSAI_URL']
@@ -4,6 +4,17 @@ from django.db.models import Case, Value, When, IntegerField, F
 
 class SubmissionQuerySet(models.QuerySet):
     def best(self, use_recent=False):
+        """
+        Keeps the best submission of each author on each task: an accepted one
+        if any, then the one with the highest score, then the earliest (or,
+        if `use_recent`, the latest) one.
+        Unfiltered querysets join the materialized stats.models.BestSubmission.
+        Filters applied before (e.g. on the submission date) change which one
+        is the best, so then the submissions are ranked on the fly.
+        """
+        if not self.query.has_filters():
+            return self.filter(**{f"{'recent_best_of' if use_recent else 'best_of'}__isnull": False})
+
         best_submissions = self.annotate(is_ac=Case(
             When(verdict='AC', then=Value(1)),
             default=Value(0),
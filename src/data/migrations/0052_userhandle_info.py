@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0051_auto_20201102_1444'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userhandle',
+            name='first_name',
+            field=models.CharField(blank=True, max_length=256, null=True),
+        ),
+        migrations.AddField(
+            model_name='userhandle',
+            name='last_name',
+            field=models.CharField(blank=True, max_length=256, null=True),
+        ),
+        migrations.AddField(
+            model_name='userhandle',
+            name='rating',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
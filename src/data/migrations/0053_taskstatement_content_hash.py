@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0052_userhandle_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskstatement',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
@@ -211,6 +211,8 @@ class TaskStatement(models.Model):
     memory_limit_kb = models.IntegerField(null=True, blank=True)
     time_limit_ms = models.IntegerField(null=True, blank=True)
     modified_by_user = models.BooleanField(default=False)
+    # Hash of the scraped content last written, to skip unchanged rescrapes.
+    content_hash = models.CharField(max_length=40, null=True, blank=True)
 
     @property
     def formatted(self):
@@ -238,6 +240,9 @@ class UserHandle(models.Model):
     handle = models.CharField(max_length=256)
     user = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='handles')
     photo_url = models.CharField(max_length=256, null=True, blank=True)
+    first_name = models.CharField(max_length=256, null=True, blank=True)
+    last_name = models.CharField(max_length=256, null=True, blank=True)
+    rating = models.IntegerField(null=True, blank=True)
 
     class Meta:
         unique_together = (('judge', 'handle'),)
@@ -1,11 +1,14 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from core.logging import log
 from cpaggregator import settings
 from data import services
-from data.models import UserProfile, Task, UserHandle
+from data.models import UserProfile, Task, UserHandle, Submission
+from scraper import resolution
+from stats import queries as stats_queries
+from stats.models import BestSubmission
 
 import celery
 
@@ -45,6 +48,12 @@ def create_task(sender, instance, created, **kwargs):
         log.info('Scraping submissions and updating users async...')
         services.scraper_services.scrape_submissions_for_tasks.si(task_path).apply_async()
 
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def forget_task(sender, instance, **kwargs):
+    resolution.tasks.forget(instance.judge.judge_id, [instance.task_id], pk=instance.pk)
+
 """
     Handle signals.
 """
@@ -59,3 +68,26 @@ def create_handle(sender, instance, created, **kwargs):
         services.scraper_services.scrape_submissions_for_users.si(handle).apply_async()
 
 
+@receiver(post_save, sender=UserHandle)
+@receiver(post_delete, sender=UserHandle)
+def forget_handle(sender, instance, **kwargs):
+    resolution.handles.forget(instance.judge.judge_id, [instance.handle.lower()], pk=instance.pk)
+
+
+@receiver(post_save, sender=UserHandle)
+def move_best_submissions(sender, instance, created, **kwargs):
+    if not created:
+        BestSubmission.objects.filter(author=instance) \
+            .exclude(profile=instance.user_id).update(profile=instance.user_id)
+
+"""
+    Submission signals.
+"""
+
+
+# Deletions need nothing: the best submission goes away with them, and
+# submissions are only deleted along with their handle or task anyway
+# (anything else is repaired by stats.services.compute_best_submissions).
+@receiver(post_save, sender=Submission)
+def update_best_submission(sender, instance, **kwargs):
+    stats_queries.update_best_submissions([(instance.author_id, instance.task_id)])
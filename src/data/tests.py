@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.contrib.auth.models import User
 from django.test import TestCase
 from pytz import UTC
@@ -96,3 +96,57 @@ class BestSubmissionManagerTestCase(TestCase):
             score=20,
             verdict='WA')
         self.assertNumQueries(1, lambda: list(Submission.objects.best().all()))
+
+    def test_use_recent(self):
+        submissions = [Submission.objects.create(
+            submission_id=str(idx),
+            submitted_on=self.today + timedelta(days=idx),
+            task=self.task,
+            author=self.handle,
+            language='C++',
+            verdict='AC') for idx in range(3)]
+        self.assertCountEqual(Submission.objects.best().all(), [submissions[0]])
+        self.assertCountEqual(Submission.objects.best(use_recent=True).all(), [submissions[2]])
+
+    def test_filters_before_best(self):
+        Submission.objects.create(
+            submission_id='1',
+            submitted_on=self.today + timedelta(days=1),
+            task=self.task,
+            author=self.handle,
+            language='C++',
+            verdict='AC')
+        submission_before = Submission.objects.create(
+            submission_id='2',
+            submitted_on=self.today,
+            task=self.task,
+            author=self.handle,
+            language='C++',
+            verdict='WA')
+        # The best submission up to that date, not the best one (if up to that date).
+        self.assertCountEqual(
+            Submission.objects.filter(submitted_on__lte=self.today).best().all(),
+            [submission_before])
+        self.assertCountEqual(
+            Submission.objects.best().filter(submitted_on__lte=self.today).all(), [])
+
+    def test_best_submission_updated(self):
+        submission = Submission.objects.create(
+            submission_id='1',
+            submitted_on=self.today,
+            task=self.task,
+            author=self.handle,
+            language='C++',
+            verdict='WA')
+        submission_later = Submission.objects.create(
+            submission_id='2',
+            submitted_on=self.today + timedelta(days=1),
+            task=self.task,
+            author=self.handle,
+            language='C++',
+            verdict='WA')
+        self.assertCountEqual(Submission.objects.best().all(), [submission])
+
+        submission_later.verdict = 'AC'
+        submission_later.save()
+        self.assertCountEqual(Submission.objects.best().all(), [submission_later])
@@ -4,3 +4,6 @@ from . import models
 # Register your models here.
 admin.site.register(models.ProfileScheduleInfo)
 admin.site.register(models.TaskScheduleInfo)
+admin.site.register(models.HandleScheduleInfo)
+admin.site.register(models.ScrapeCheckpoint)
+admin.site.register(models.AvatarInfo)
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0051_auto_20201102_1444'),
+        ('schedule', '0007_auto_20201102_1634'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskscheduleinfo',
+            name='last_submission_id',
+            field=models.CharField(blank=True, max_length=256, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskscheduleinfo',
+            name='last_submitted_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='HandleScheduleInfo',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_submission_id', models.CharField(blank=True, max_length=256, null=True)),
+                ('last_submitted_on', models.DateTimeField(blank=True, null=True)),
+                ('handle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_info', to='data.UserHandle')),
+            ],
+        ),
+    ]
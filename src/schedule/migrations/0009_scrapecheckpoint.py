@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0008_submission_watermarks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_key', models.CharField(max_length=256, unique=True)),
+                ('judge_id', models.CharField(max_length=256)),
+                ('task_id', models.CharField(max_length=256)),
+                ('page_id', models.IntegerField(blank=True, null=True)),
+                ('newest_submission_id', models.CharField(blank=True, max_length=256, null=True)),
+                ('newest_submitted_on', models.DateTimeField(blank=True, null=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0009_scrapecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvatarInfo',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.CharField(max_length=512, unique=True)),
+                ('sha1', models.CharField(max_length=40)),
+                ('etag', models.CharField(blank=True, max_length=256, null=True)),
+                ('last_modified', models.CharField(blank=True, max_length=256, null=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from data.models import UserProfile, Task
+from data.models import UserProfile, UserHandle, Task
 
 
 class ProfileScheduleInfo(models.Model):
@@ -17,6 +17,57 @@ class TaskScheduleInfo(models.Model):
         Task, on_delete=models.CASCADE,
         related_name='schedule_info')
     last_updated_on = models.DateTimeField(null=True, blank=True)
+    # High-water mark: all submissions up to this one have been scraped.
+    last_submission_id = models.CharField(max_length=256, null=True, blank=True)
+    last_submitted_on = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.task} [updated on {self.last_updated_on}]"
+
+
+class HandleScheduleInfo(models.Model):
+    handle = models.OneToOneField(
+        UserHandle, on_delete=models.CASCADE,
+        related_name='schedule_info')
+    # High-water mark: all submissions up to this one have been scraped.
+    last_submission_id = models.CharField(max_length=256, null=True, blank=True)
+    last_submitted_on = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.handle} [last submitted on {self.last_submitted_on}]"
+
+
+class ScrapeCheckpoint(models.Model):
+    """
+    Progress of a long submission scrape, so that a restarted run resumes
+    where the previous one stopped instead of starting over.
+    """
+    run_key = models.CharField(max_length=256, unique=True)
+    judge_id = models.CharField(max_length=256)
+    # The task being scraped, in the (sorted) order of the run.
+    task_id = models.CharField(max_length=256)
+    # The last page of the task whose submissions were written, if any.
+    page_id = models.IntegerField(null=True, blank=True)
+    # The newest submission of the task written so far (for its watermark).
+    newest_submission_id = models.CharField(max_length=256, null=True, blank=True)
+    newest_submitted_on = models.DateTimeField(null=True, blank=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.run_key} [at {self.task_id}, page {self.page_id}]"
+
+
+class AvatarInfo(models.Model):
+    """
+    What was last seen of a scraped avatar, so that it is downloaded
+    again only if it changed.
+    """
+    url = models.CharField(max_length=512, unique=True)
+    sha1 = models.CharField(max_length=40)
+    # Validators sent by the judge, if any.
+    etag = models.CharField(max_length=256, null=True, blank=True)
+    last_modified = models.CharField(max_length=256, null=True, blank=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.url} [{self.sha1}]"
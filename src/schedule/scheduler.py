@@ -13,8 +13,8 @@ scheduler = BlockingScheduler(job_defaults=job_defaults)
 
 @scheduler.scheduled_job('interval', seconds=30)
 def scrape_recent_submissions():
-    for judge_id in ['ia', 'cf']:
-        scraper_services.scrape_recent_submissions(judge_id)
+    # Judges are scraped concurrently, each with its own timeout.
+    scraper_services.scrape_recent_submissions('ia', 'cf')
 
 
 @scheduler.scheduled_job('interval', seconds=10)
@@ -42,10 +42,24 @@ def scrape_task_info():
     services.scrape_task_info()
 
 
-@scheduler.scheduled_job('interval', minutes=2)
+@scheduler.scheduled_job('interval', seconds=10)
+def update_statistics():
+    # Only the users and tasks whose submissions changed.
+    stats_services.update_statistics()
+
+
+@scheduler.scheduled_job('interval', hours=1)
+def compute_best_submissions():
+    # Best submissions are kept up to date as they are written: this repairs
+    # the ones missed (e.g. of deleted submissions).
+    stats_services.compute_best_submissions()
+
+
+@scheduler.scheduled_job('interval', hours=1)
 def compute_statistics():
-    stats_services.compute_user_statistics()
+    # Task difficulties first, as user points depend on them.
     stats_services.compute_task_statistics()
+    stats_services.compute_user_statistics()
     stats_services.compute_ladder_statistics()
 
 
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import requests
+from django.conf import settings
+from requests.structures import CaseInsensitiveDict
+
+from core.logging import log
+from scraper import sessions
+
+# Response headers kept along with the cached body.
+STORED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified']
+
+
+def __get_paths(page_url):
+    judge_id = sessions.get_judge_id(page_url)
+    key = hashlib.sha1(page_url.encode()).hexdigest()
+    base_path = os.path.join(settings.SCRAPER_CACHE_DIR, judge_id, key)
+    return base_path + '.json', base_path + '.body'
+
+
+def __write_atomic(path, data: bytes):
+    # Several workers may cache the same page, so never leave a half-written file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def __load(page_url):
+    meta_path, body_path = __get_paths(page_url)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            body = f.read()
+    except (OSError, ValueError):
+        return None, None
+    if meta.get('url') != page_url:
+        return None, None
+    return meta, body
+
+
+def __store_meta(page_url, meta):
+    meta_path, _ = __get_paths(page_url)
+    __write_atomic(meta_path, json.dumps(meta).encode())
+
+
+def __store(page_url, response):
+    meta = {
+        'url': page_url,
+        'stored_on': time.time(),
+        'encoding': response.encoding,
+        'headers': {name: response.headers[name]
+                    for name in STORED_HEADERS if name in response.headers},
+    }
+    _, body_path = __get_paths(page_url)
+    # Body first, so that the metadata never points to a missing body.
+    __write_atomic(body_path, response.content)
+    __store_meta(page_url, meta)
+
+
+def __build_response(page_url, meta, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = page_url
+    response.encoding = meta['encoding']
+    response.headers = CaseInsensitiveDict(meta['headers'])
+    response._content = body
+    return response
+
+
+def get_cached_page(page_url: str, fetch) -> requests.Response:
+    """
+    Gets a page through the on-disk cache.
+    Cached pages are returned as they are for CACHE_TTL seconds (option of
+    settings.SCRAPER_HTTP). After that, they are revalidated with the judge,
+    through If-None-Match / If-Modified-Since, if the judge sent an ETag or
+    a Last-Modified header; otherwise, they are downloaded again.
+    :param page_url: the url of the page (including the query string)
+    :param fetch: function sending the GET request, given the extra headers
+    :return: the page, either from the cache or from the judge
+    """
+    meta, body = __load(page_url)
+    if meta is not None:
+        ttl = sessions.get_option(sessions.get_judge_id(page_url), 'CACHE_TTL')
+        if time.time() - meta['stored_on'] < ttl:
+            log.debug(f"CACHE HIT: {page_url}")
+            return __build_response(page_url, meta, body)
+
+    headers = {}
+    if meta is not None:
+        if 'ETag' in meta['headers']:
+            headers['If-None-Match'] = meta['headers']['ETag']
+        if 'Last-Modified' in meta['headers']:
+            headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+    response = fetch(headers)
+    if response.status_code == 304 and meta is not None:
+        log.debug(f"CACHE REVALIDATED: {page_url}")
+        meta['stored_on'] = time.time()
+        __store_meta(page_url, meta)
+        return __build_response(page_url, meta, body)
+
+    if response.status_code == 200:
+        try:
+            __store(page_url, response)
+        except OSError as ex:
+            log.warning(f"Could not cache page {page_url}: {ex}")
+    return response
@@ -0,0 +1,108 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exception):
+        self.exception = exception
+
+
+class _Producer:
+    """
+    Consumes a generator inside a worker thread, handing its elements over
+    to the consumer in chunks through a bounded queue.
+    """
+    def __init__(self, max_pending_chunks):
+        self.chunks = queue.Queue(maxsize=max_pending_chunks)
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def put(self, elem):
+        # Blocks while the queue is full, unless the consumer gave up on us.
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(elem, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(self, generator_fn, item, chunk_size):
+        chunk = []
+        try:
+            for elem in generator_fn(item):
+                chunk.append(elem)
+                if len(chunk) == chunk_size:
+                    if not self.put(chunk):
+                        return
+                    chunk = []
+            if chunk and not self.put(chunk):
+                return
+            self.put(_DONE)
+        except Exception as ex:
+            # Hand over what was generated before the failure.
+            if chunk and not self.put(chunk):
+                return
+            self.put(_Failure(ex))
+
+    def consume(self):
+        while True:
+            elem = self.chunks.get()
+            if elem is _DONE:
+                return
+            if isinstance(elem, _Failure):
+                raise elem.exception
+            yield elem
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+def imap_chunked(generator_fn, items, max_workers, chunk_size=1000, max_pending_chunks=10):
+    """
+    Consumes the generators `generator_fn(item)` for all items concurrently,
+    using at most `max_workers` threads.
+    Yields an `(item, chunks)` pair for each item, in the order of `items`,
+    where `chunks` iterates through the elements generated for that item in
+    lists of (at most) `chunk_size`, in generation order. Any exception raised
+    by the generator is re-raised while iterating through `chunks`.
+    :param generator_fn: function returning a generator (e.g. of submissions)
+    :param items: the items to call `generator_fn` for (e.g. task ids)
+    :param max_workers: how many generators to consume at the same time
+    :param chunk_size: the maximum number of elements in a chunk
+    :param max_pending_chunks: how many chunks a generator may produce
+        ahead of the consumer
+    """
+    items = iter(items)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next():
+            item = next(items, _DONE)
+            if item is _DONE:
+                return
+            producer = _Producer(max_pending_chunks)
+            producer.future = executor.submit(
+                producer.produce, generator_fn, item, chunk_size)
+            pending.append((item, producer))
+
+        try:
+            for _ in range(max_workers):
+                submit_next()
+
+            while pending:
+                item, producer = pending[0]
+                submit_next()
+                yield item, producer.consume()
+                # The consumer moved on, so nobody will read the rest of the chunks.
+                producer.cancel()
+                pending.popleft()
+        finally:
+            for _, producer in pending:
+                producer.cancel()
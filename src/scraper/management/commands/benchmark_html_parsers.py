@@ -0,0 +1,53 @@
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from scraper import parsing
+
+
+class Command(BaseCommand):
+    help = 'Compares the HTML parser backends on saved pages (e.g. monitor pages).'
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument('pages', nargs='+', help='Paths to saved HTML pages.')
+        parser.add_argument('--selector', required=True,
+                            help="CSS selector of the table (e.g. '#monitor-table').")
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        pages = []
+        for path in options['pages']:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        selector = options['selector']
+
+        def full_tree(page, parser):
+            # The way the scrapers used to parse pages.
+            return BeautifulSoup(page, parser).select_one(selector)
+
+        def strained_tree(page, parser):
+            return parsing.select_one(page, selector, parser=parser)
+
+        parsers = ['html.parser']
+        if parsing.DEFAULT_PARSER != 'html.parser':
+            parsers.append(parsing.DEFAULT_PARSER)
+
+        baseline = None
+        for parser in parsers:
+            for name, parse in [('full', full_tree), ('strained', strained_tree)]:
+                rows = 0
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    for page in pages:
+                        table = parse(page, parser)
+                        for row in table.find_all('tr'):
+                            row.find_all('td')
+                            rows += 1
+                elapsed = time.perf_counter() - start
+                page_count = options['repeat'] * len(pages)
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f"{parser:>12} {name:>8}: {1000 * elapsed / page_count:8.2f} ms/page, "
+                    f"{rows / elapsed:10.0f} rows/s, {baseline / elapsed:5.2f}x")
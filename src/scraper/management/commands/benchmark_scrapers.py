@@ -0,0 +1,102 @@
+import argparse
+import itertools
+import tempfile
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.logging import log
+from scraper import replay
+from scraper.scrapers import __SUBMISSION_SCRAPERS__
+
+# Judges without recent submissions are benchmarked on the submissions of a task.
+SAMPLE_TASKS = {
+    'csa': 'closest-pair',
+    'ac': 'agc003/agc003_a',
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the scrapers on recorded responses of the judges (no network needed).'
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument('--record', action='store_true',
+                            help='Scrape the live judges and record their responses, '
+                                 'instead of replaying them.')
+        parser.add_argument('--fixtures_dir', default=settings.SCRAPER_FIXTURES_DIR)
+        parser.add_argument('--judges', nargs='*',
+                            help='Judge ids to benchmark (default: all of them).')
+        parser.add_argument('--limit', type=int, default=1000,
+                            help='Number of submissions scraped per judge.')
+        parser.add_argument('--repeat', type=int, default=1)
+
+    def __scrape(self, scraper_kls, limit):
+        # Bootstrap requests (e.g. CSRF tokens) are part of the benchmark.
+        scraper = scraper_kls()
+        task_id = SAMPLE_TASKS.get(scraper_kls.JUDGE_ID)
+        if task_id is None:
+            submissions = scraper.scrape_recent_submissions()
+        else:
+            submissions = scraper.scrape_submissions_for_task(task_id)
+        return sum(1 for _ in itertools.islice(submissions, limit))
+
+    def __run(self, scraper_kls, mode, options, trace=False):
+        # A fresh page cache, so that cached pages are requested too.
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                override_settings(SCRAPER_CACHE_DIR=cache_dir), \
+                replay.use_fixtures(options['fixtures_dir'], mode) as adapter:
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            submissions = 0
+            try:
+                submissions = self.__scrape(scraper_kls, options['limit'])
+            except replay.FixtureNotFound as ex:
+                log.warning(ex)
+            elapsed = time.perf_counter() - start
+            peak = 0
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+        judge_id = scraper_kls.JUDGE_ID
+        return (adapter.request_count[judge_id], adapter.missing_count[judge_id],
+                submissions, elapsed, peak)
+
+    def handle(self, *args, **options):
+        mode = replay.RECORD if options['record'] else replay.REPLAY
+
+        for scraper_kls in __SUBMISSION_SCRAPERS__:
+            judge_id = scraper_kls.JUDGE_ID
+            if options['judges'] and judge_id not in options['judges']:
+                continue
+
+            if mode == replay.RECORD:
+                pages, _, submissions, _, _ = self.__run(scraper_kls, mode, options)
+                self.stdout.write(f"{judge_id:>6}: recorded {pages} pages "
+                                  f"({submissions} submissions)")
+                continue
+
+            # Tracing allocations slows everything down, so it gets a run of its own.
+            pages, missing, _, _, peak = self.__run(scraper_kls, mode, options, trace=True)
+            if missing > 0:
+                self.stdout.write(
+                    f"{judge_id:>6}: {missing} of {pages} responses were never recorded "
+                    f"(record them with --record)")
+                continue
+
+            pages, submissions, elapsed = 0, 0, 0.
+            for _ in range(options['repeat']):
+                run_pages, _, run_submissions, run_elapsed, _ = \
+                    self.__run(scraper_kls, mode, options)
+                pages += run_pages
+                submissions += run_submissions
+                elapsed += run_elapsed
+            self.stdout.write(
+                f"{judge_id:>6}: {pages / elapsed:8.2f} pages/s, "
+                f"{submissions / elapsed:10.0f} submissions/s, "
+                f"{peak / 2 ** 20:8.2f} MiB peak "
+                f"({pages} pages, {submissions} submissions in {elapsed:.2f}s)")
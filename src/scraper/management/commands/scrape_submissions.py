@@ -15,6 +15,12 @@ class Command(BaseCommand):
         parser.add_argument('--tasks', nargs='*')
         parser.add_argument('--users', nargs='*')
         parser.add_argument('--judges', nargs='*')
+        parser.add_argument('--full', action='store_true',
+                            help='Ignore the high-water marks of tasks/users '
+                                 'and scrape everything up to --to_days.')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Load the submissions through COPY '
+                                 '(faster for backfilling long histories).')
 
     def handle(self, *args, **options):
         if not options['tasks'] and not options['users'] and not options['judges']:
@@ -26,12 +32,16 @@ class Command(BaseCommand):
                 *options['tasks'],
                 from_days=options['from_days'],
                 to_days=options['to_days'],
+                full=options['full'],
+                bulk=options['bulk'],
             )
         elif options.get('users'):
             services.scrape_submissions_for_users(
                 *options['users'],
                 from_days=options['from_days'],
                 to_days=options['to_days'],
+                full=options['full'],
+                bulk=options['bulk'],
             )
         elif options.get('judges'):
             services.scrape_recent_submissions(
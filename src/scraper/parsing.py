@@ -0,0 +1,63 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+from django.conf import settings
+
+from core.logging import log
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+
+def get_parser() -> str:
+    """
+    Gets the parser backend used by BeautifulSoup: settings.SCRAPER_HTML_PARSER
+    if set, otherwise lxml (C-accelerated) if installed, otherwise the
+    pure-Python 'html.parser'.
+    """
+    return getattr(settings, 'SCRAPER_HTML_PARSER', None) or DEFAULT_PARSER
+
+
+def get_strainer(css_selector: str) -> SoupStrainer:
+    """
+    Builds a SoupStrainer keeping only the elements matching the first
+    (simple) part of a CSS selector, like '#id', '.class' or 'tag.class'.
+    :param css_selector: the selector (e.g. '.container .table')
+    """
+    match = re.fullmatch(r'([\w-]*)(?:#([\w-]+))?(?:\.([\w-]+))?', css_selector.split()[0])
+    if match is None or not any(match.groups()):
+        raise ValueError(f"Unsupported selector for straining: '{css_selector}'")
+    name, element_id, class_name = match.groups()
+    attrs = {}
+    if element_id:
+        attrs['id'] = element_id
+    if class_name:
+        attrs['class'] = class_name
+    return SoupStrainer(name or None, attrs=attrs)
+
+
+def parse(markup, css_selector: str = None, parser: str = None) -> BeautifulSoup:
+    """
+    Parses an HTML page.
+    :param markup: the page content (str or bytes)
+    :param css_selector: if given, only the elements matching its first part
+    are built into the tree (much faster when only a table is needed)
+    :param parser: the parser backend (defaults to get_parser())
+    """
+    parse_only = get_strainer(css_selector) if css_selector else None
+    return BeautifulSoup(markup, parser or get_parser(), parse_only=parse_only)
+
+
+def select_one(markup, css_selector: str, parser: str = None):
+    """
+    Parses just the part of a page needed to find an element.
+    :return: the first element matching `css_selector`, or None
+    """
+    soup = parse(markup, css_selector, parser=parser)
+    element = soup.select_one(css_selector)
+    if element is None:
+        log.debug(f"Could not find element with selector '{css_selector}'")
+    return element
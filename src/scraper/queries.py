@@ -1,11 +1,40 @@
-from django.core.exceptions import ObjectDoesNotExist
+import hashlib
+import json
+import tempfile
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
+from django.db.models import Q
 from django.db.models.functions import Lower
 from django.utils import timezone
 
 from data.models import UserHandle, Submission, Task, TaskStatement, MethodTag, TaskSource, JudgeTaskStatistic, Judge
 import math
 from core.logging import log
+from schedule.models import TaskScheduleInfo, HandleScheduleInfo, ScrapeCheckpoint, AvatarInfo
 from django.utils.text import slugify
+from psycopg2.extras import execute_values
+
+from scraper import resolution
+from scraper.utils import split_into_chunks
+from stats import queries as stats_queries
+
+# Submissions are written (and committed) this many at a time.
+SUBMISSION_CHUNK_SIZE = 1000
+# Columns written by the submission upsert, and the ones updated on conflict.
+SUBMISSION_FIELDS = ['submission_id', 'author', 'submitted_on', 'task', 'verdict',
+                     'language', 'source_size', 'score', 'exec_time', 'memory_used']
+SUBMISSION_UPDATED_FIELDS = ['verdict', 'score', 'exec_time', 'memory_used']
+# Task infos are written this many at a time.
+TASK_CHUNK_SIZE = 500
+# Rows staged by copy_submissions() are kept in memory up to this size (in bytes),
+# then spooled to disk.
+COPY_SPOOL_SIZE = 64 * 1024 * 1024
+# Scraped handle info written to UserHandle, if present (photo_url always is).
+HANDLE_INFO_FIELDS = ['first_name', 'last_name', 'rating']
+# Scraped task info that makes up TaskStatement.content_hash.
+STATEMENT_INFO_KEYS = ['statement', 'examples', 'time_limit', 'memory_limit',
+                       'input_file', 'output_file']
 
 
 def is_valid(sub):
@@ -14,8 +43,59 @@ def is_valid(sub):
     return True
 
 
-def write_submissions(submissions):
-    submissions = list(submissions)
+def __get_on_conflict_sql():
+    # Shared by the upsert and the COPY loader, so that both update alike.
+    table = Submission._meta.db_table
+    old_values, new_values = [], []
+    for name in SUBMISSION_UPDATED_FIELDS:
+        field = Submission._meta.get_field(name)
+        old_values.append(f"{table}.{field.column}")
+        if field.null:
+            # A rescrape missing a value (e.g. while judging) does not erase it.
+            new_values.append(f"COALESCE(EXCLUDED.{field.column}, {table}.{field.column})")
+        else:
+            new_values.append(f"EXCLUDED.{field.column}")
+    updated_columns = [Submission._meta.get_field(name).column
+                       for name in SUBMISSION_UPDATED_FIELDS]
+    return f"""
+        ON CONFLICT (submission_id, author_id) DO UPDATE
+        SET ({', '.join(updated_columns)}) = ROW({', '.join(new_values)})
+        WHERE ({', '.join(old_values)}) IS DISTINCT FROM ({', '.join(new_values)})
+        RETURNING (xmax = 0) AS created, author_id, task_id
+    """
+
+
+def __get_upsert_submissions_sql():
+    columns = [Submission._meta.get_field(name).column for name in SUBMISSION_FIELDS]
+    return f"""
+        INSERT INTO {Submission._meta.db_table} ({', '.join(columns)}) VALUES %s
+        {__get_on_conflict_sql()}
+    """
+
+
+def __upsert_submissions(submission_models):
+    """
+    Inserts submissions, updating the verdict (and score, time, memory) of
+    the ones already in the database, in a single statement.
+    Rows that would not change are not touched, and only the best submissions
+    (see stats.models.BestSubmission) of the changed ones are updated.
+    :return: a (created count, updated count) tuple
+    """
+    rows = [tuple(getattr(model, Submission._meta.get_field(name).attname)
+                  for name in SUBMISSION_FIELDS)
+            for model in submission_models]
+    with connection.cursor() as cursor:
+        # A single page, hence a single statement whose RETURNING rows are all
+        # fetched here (execute_values() of psycopg2 2.7 has no `fetch` argument).
+        execute_values(cursor, __get_upsert_submissions_sql(), rows, page_size=len(rows))
+        results = cursor.fetchall()
+    stats_queries.update_best_submissions(
+        (author_id, task_id) for _, author_id, task_id in results)
+    created = sum(1 for is_created, _, _ in results if is_created)
+    return created, len(results) - created
+
+
+def __write_submission_chunk(submissions):
     valid_submissions = []
     for sub in submissions:
         if not is_valid(sub):
@@ -24,33 +104,34 @@ def write_submissions(submissions):
             valid_submissions.append(sub)
     submissions = valid_submissions
 
-    # Get all handles.
-    handles = {(handle.judge.judge_id, handle.handle.lower()): handle
-               for handle in UserHandle.objects.annotate(handle_lower=Lower('handle')).filter(
-        handle_lower__in={sub['author_id'].lower() for sub in submissions})
-        .select_related('judge')}
-    # Get all required tasks.
-    tasks = {(task.judge.judge_id, task.task_id): task
-             for task in Task.objects.filter(
-        task_id__in={sub['task_id'] for sub in submissions})
-        .select_related('judge')}
+    # Resolve the handles/tasks of each judge (from the cache, mostly).
+    handles, tasks = {}, {}
+    for judge_id in {sub['judge_id'] for sub in submissions}:
+        judge_submissions = [sub for sub in submissions if sub['judge_id'] == judge_id]
+        for handle, pk in resolution.handles.resolve(
+                judge_id, [sub['author_id'].lower() for sub in judge_submissions]).items():
+            handles[(judge_id, handle)] = pk
+        for task_id, pk in resolution.tasks.resolve(
+                judge_id, [sub['task_id'] for sub in judge_submissions]).items():
+            tasks[(judge_id, task_id)] = pk
 
     log.info(f"Writing {len(submissions)} submissions to database...")
     log.debug(f"TASKS: {tasks}")
     log.debug(f"HANDLES: {handles}")
 
-    submission_models = []
+    # Keyed by the unique key, as a row may not be upserted twice in a statement.
+    submission_models = {}
     for sub in submissions:
-        author = handles.get((sub['judge_id'], sub['author_id']))
-        task = tasks.get((sub['judge_id'], sub['task_id']))
-        if not author or not task:
+        author_id = handles.get((sub['judge_id'], sub['author_id'].lower()))
+        task_id = tasks.get((sub['judge_id'], sub['task_id']))
+        if not author_id or not task_id:
             continue
 
         fields = dict(
             submission_id=sub['submission_id'],
-            author=author,
+            author_id=author_id,
             submitted_on=timezone.make_aware(sub['submitted_on']),
-            task=task,
+            task_id=task_id,
             verdict=sub['verdict'],
             language=sub.get('language'),
             source_size=sub.get('source_size'),
@@ -61,66 +142,359 @@ def write_submissions(submissions):
         if fields['score'] and math.isnan(fields['score']):
             fields['score'] = None
         fields = {k: v for k, v in fields.items() if v is not None}
-        submission_models.append(Submission(**fields))
-
-    if submission_models:
-        result = Submission.objects.bulk_create(
-            submission_models, ignore_conflicts=True)
-        to_update = [x for x in result if x.pk is None]
-        log.warning("TODO: Implement update!")
-        log.success(f"Successfully upserted {len(submission_models)} submissions! "
-                    f"({len(result) - len(to_update)} created, 0 updated)")
+        submission_models[(sub['submission_id'], author_id)] = Submission(**fields)
+
+    if not submission_models:
+        return 0
+    created, updated = __upsert_submissions(submission_models.values())
+    log.info(f"Upserted {len(submission_models)} submissions "
+             f"({created} created, {updated} updated)")
+    return len(submission_models)
+
+
+def write_submissions(submissions, chunk_size=SUBMISSION_CHUNK_SIZE):
+    """
+    Writes submissions to the database, `chunk_size` at a time.
+    The submissions are consumed lazily, so a generator of a whole scrape
+    never sits in memory, and each chunk is committed (and visible) as soon
+    as it is scraped. Submissions of unknown handles/tasks are skipped.
+    :param submissions: list/generator of submissions
+    :param chunk_size: how many submissions to be written at once
+    :return: the number of submissions upserted
+    """
+    total_upserted = 0
+    for chunk in split_into_chunks(submissions, chunk_size):
+        try:
+            with transaction.atomic():
+                total_upserted += __write_submission_chunk(chunk)
+        except IntegrityError:
+            # Most likely a handle/task deleted by another process, but
+            # still in the resolution cache of this one.
+            log.warning("Integrity error while writing submissions. Retrying uncached...")
+            resolution.handles.clear()
+            resolution.tasks.clear()
+            with transaction.atomic():
+                total_upserted += __write_submission_chunk(chunk)
+
+    if total_upserted > 0:
+        log.success(f"Successfully upserted {total_upserted} submissions!")
     else:
         log.info("No submissions to upsert.")
+    return total_upserted
 
 
-def write_tasks(tasks):
-    tasks = list(tasks)
-    task_tags = {tag.tag_id: tag for tag in MethodTag.objects.all()}
-    judges = {judge.judge_id: judge for judge in Judge.objects.all()}
+def __to_copy_value(value):
+    # The text format of COPY.
+    if value is None:
+        return '\\N'
+    if not isinstance(value, str):
+        return str(value)
+    return (value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
 
-    total_created = 0
-    for task_info in tasks:
-        judge = judges[task_info['judge_id']]
-        task, created = Task.objects.get_or_create(
-            judge=judge, task_id=task_info['task_id'])
-        if created:
-            total_created += 1
-        task.name = task_info['title']
-        if 'statement' in task_info:
-            statement, _ = TaskStatement.objects.get_or_create(task=task)
-            if 'time_limit' in task_info:
-                statement.time_limit_ms = task_info['time_limit']
-            if 'memory_limit' in task_info:
-                statement.memory_limit_kb = task_info['memory_limit']
-            if 'input_file' in task_info:
-                statement.input_file = task_info['input_file']
-            if 'output_file' in task_info:
-                statement.output_file = task_info['output_file']
-
-            if statement.modified_by_user:
-                log.info(
-                    f"Skipped updating statement for {task}: modified by user")
-            else:
-                statement.text = task_info['statement']
-                statement.examples = task_info['examples']
-            statement.save()
 
+def __get_copy_lines(submissions, stats):
+    for sub in submissions:
+        if not is_valid(sub):
+            log.warning(f"Not a valid submission: {sub}")
+            continue
+        score = sub.get('score')
+        if score is not None and math.isnan(score):
+            score = None
+        row = [sub['judge_id'], sub['submission_id'], sub['author_id'].lower(), sub['task_id'],
+               timezone.make_aware(sub['submitted_on']).isoformat(), sub['verdict'],
+               sub.get('language'), sub.get('source_size'), score,
+               sub.get('exec_time'), sub.get('memory_used')]
+        stats['staged'] += 1
+        yield '\t'.join(map(__to_copy_value, row)) + '\n'
+
+
+def copy_submissions(submissions):
+    """
+    Bulk-loads (a lot of) submissions, e.g. for backfilling the history
+    of new judges or handles. Rows are first buffered (so that a slow scrape
+    does not hold a transaction open), then loaded with COPY into a temporary
+    staging table and merged into the submissions in a single statement,
+    which resolves the handles/tasks and updates the existing submissions
+    just like write_submissions() does. Of the rows staged more than once,
+    the last one wins. The load and the merge are one transaction.
+    :param submissions: list/generator of submissions
+    :return: a (created count, updated count) tuple
+    """
+    stats = {'staged': 0}
+    columns = [Submission._meta.get_field(name).column for name in SUBMISSION_FIELDS]
+    with tempfile.SpooledTemporaryFile(max_size=COPY_SPOOL_SIZE, mode='w+') as buffer:
+        buffer.writelines(__get_copy_lines(submissions, stats))
+        buffer.seek(0)
+        log.info(f"Scraped {stats['staged']} submissions. Loading...")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE scraper_submission_staging (
+                    row_id serial, judge_id text, submission_id text, author text, task_id text,
+                    submitted_on timestamp with time zone, verdict text, language text,
+                    source_size integer, score integer, exec_time integer, memory_used integer
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert("""
+                COPY scraper_submission_staging (
+                    judge_id, submission_id, author, task_id, submitted_on, verdict,
+                    language, source_size, score, exec_time, memory_used
+                ) FROM STDIN
+            """, buffer)
+
+            cursor.execute(f"""
+                WITH merged AS (
+                    INSERT INTO {Submission._meta.db_table} ({', '.join(columns)})
+                    SELECT DISTINCT ON (s.submission_id, h.id)
+                        s.submission_id, h.id, s.submitted_on, t.id, s.verdict,
+                        COALESCE(s.language, ''), s.source_size, s.score, s.exec_time, s.memory_used
+                    FROM scraper_submission_staging s
+                    INNER JOIN {Judge._meta.db_table} j ON j.judge_id = s.judge_id
+                    INNER JOIN {UserHandle._meta.db_table} h
+                        ON h.judge_id = j.id AND LOWER(h.handle) = s.author
+                    INNER JOIN {Task._meta.db_table} t
+                        ON t.judge_id = j.id AND t.task_id = s.task_id
+                    ORDER BY s.submission_id, h.id, s.row_id DESC
+                    {__get_on_conflict_sql()}
+                )
+                SELECT COUNT(*) FILTER (WHERE created), COUNT(*) FILTER (WHERE NOT created),
+                    array_agg(DISTINCT ARRAY[author_id, task_id])
+                FROM merged
+            """)
+            created, updated, pairs = cursor.fetchone()
+            stats_queries.update_best_submissions(map(tuple, pairs or []))
+            # Dropped on commit anyway, but the caller's transaction may load more.
+            cursor.execute("DROP TABLE scraper_submission_staging")
+
+    log.success(f"Successfully loaded {stats['staged']} submissions! "
+                f"({created} created, {updated} updated)")
+    return created, updated
+
+
+def get_task_watermarks(judge_id, task_ids):
+    """
+    Gets the high-water marks of some tasks.
+    :return: a dict from task ids to the (naive) date of the newest submission
+    scraped for that task, for the tasks that have been scraped before
+    """
+    infos = TaskScheduleInfo.objects.filter(
+        task__judge__judge_id=judge_id, task__task_id__in=task_ids,
+        last_submitted_on__isnull=False)
+    return {task_id: timezone.make_naive(submitted_on)
+            for task_id, submitted_on in infos.values_list('task__task_id', 'last_submitted_on')}
+
+
+def get_handle_watermarks(judge_id, handles):
+    """
+    Gets the high-water marks of some handles.
+    :return: a dict from (lowercase) handles to the (naive) date of the newest
+    submission scraped for that handle, for the handles scraped before
+    """
+    infos = HandleScheduleInfo.objects.annotate(handle_lower=Lower('handle__handle')).filter(
+        handle__judge__judge_id=judge_id,
+        handle_lower__in={handle.lower() for handle in handles},
+        last_submitted_on__isnull=False)
+    return {handle: timezone.make_naive(submitted_on)
+            for handle, submitted_on in infos.values_list('handle_lower', 'last_submitted_on')}
+
+
+def write_task_watermark(judge_id, task_id, submission):
+    task = Task.objects.filter(judge__judge_id=judge_id, task_id=task_id).first()
+    if task is None:
+        return
+    TaskScheduleInfo.objects.update_or_create(task=task, defaults=dict(
+        last_submission_id=submission['submission_id'],
+        last_submitted_on=timezone.make_aware(submission['submitted_on'])))
+
+
+def write_handle_watermark(judge_id, handle, submission):
+    handle = UserHandle.objects.filter(
+        judge__judge_id=judge_id, handle__iexact=handle).first()
+    if handle is None:
+        return
+    HandleScheduleInfo.objects.update_or_create(handle=handle, defaults=dict(
+        last_submission_id=submission['submission_id'],
+        last_submitted_on=timezone.make_aware(submission['submitted_on'])))
+
+
+def get_checkpoint(run_key, max_age):
+    """
+    Gets the checkpoint of a scrape run, unless it is older than `max_age`.
+    """
+    return ScrapeCheckpoint.objects.filter(
+        run_key=run_key, updated_on__gte=timezone.now() - max_age).first()
+
+
+def write_checkpoint(run_key, judge_id, task_id, page_id=None, newest=None):
+    ScrapeCheckpoint.objects.update_or_create(run_key=run_key, defaults=dict(
+        judge_id=judge_id,
+        task_id=task_id,
+        page_id=page_id,
+        newest_submission_id=newest['submission_id'] if newest else None,
+        newest_submitted_on=timezone.make_aware(newest['submitted_on']) if newest else None))
+
+
+def delete_checkpoint(run_key):
+    ScrapeCheckpoint.objects.filter(run_key=run_key).delete()
+
+
+def get_avatar_info(url):
+    return AvatarInfo.objects.filter(url=url).first()
+
+
+def write_avatar_info(url, sha1, etag=None, last_modified=None):
+    AvatarInfo.objects.update_or_create(url=url, defaults=dict(
+        sha1=sha1, etag=etag, last_modified=last_modified))
+
+
+def __write_task_sources(task_infos, judges):
+    """
+    Creates the missing sources of some tasks.
+    :return: a dict from (judge pk, source id) to the TaskSource pk
+    """
+    names = {}
+    for task_info in task_infos:
+        if 'source' in task_info:
+            judge = judges[task_info['judge_id']]
+            names[(judge.pk, slugify(task_info['source']))] = task_info['source']
+    if not names:
+        return {}
+
+    TaskSource.objects.bulk_create([
+        TaskSource(judge_id=judge_pk, source_id=source_id, name=name)
+        for (judge_pk, source_id), name in names.items()], ignore_conflicts=True)
+    sources = TaskSource.objects.filter(
+        judge__in={judge_pk for judge_pk, _ in names},
+        source_id__in={source_id for _, source_id in names})
+    return {(source.judge_id, source.source_id): source.pk for source in sources}
+
+
+def __get_statement_hash(task_info):
+    content = {key: task_info[key] for key in STATEMENT_INFO_KEYS if key in task_info}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def __write_task_statements(task_infos, tasks):
+    """
+    Writes the statements of some tasks, unless the scraped content is the
+    same as last time (compared through TaskStatement.content_hash, so that
+    the texts are not even loaded).
+    :return: the pks of the tasks whose statements changed
+    """
+    statements = {statement.task_id: statement for statement in TaskStatement.objects.filter(
+        task__in=[tasks[key].pk for key in task_infos])
+        .only('id', 'task_id', 'content_hash', 'modified_by_user')}
+
+    new_statements, updated_statements, user_statements = [], [], []
+    for key, task_info in task_infos.items():
+        task = tasks[key]
+        content_hash = __get_statement_hash(task_info)
+        statement = statements.get(task.pk)
+        if statement is None:
+            statement = TaskStatement(task=task)
+            new_statements.append(statement)
+        elif statement.content_hash == content_hash:
+            continue
+        elif statement.modified_by_user:
+            user_statements.append(statement)
+        else:
+            updated_statements.append(statement)
+        statement.content_hash = content_hash
+        if 'time_limit' in task_info:
+            statement.time_limit_ms = task_info['time_limit']
+        if 'memory_limit' in task_info:
+            statement.memory_limit_kb = task_info['memory_limit']
+        if 'input_file' in task_info:
+            statement.input_file = task_info['input_file']
+        if 'output_file' in task_info:
+            statement.output_file = task_info['output_file']
+
+        if statement.modified_by_user:
+            log.info(
+                f"Skipped updating statement for {task}: modified by user")
+        else:
+            statement.text = task_info['statement']
+            statement.examples = task_info['examples']
+
+    fields = ['content_hash', 'input_file', 'output_file', 'memory_limit_kb', 'time_limit_ms']
+    TaskStatement.objects.bulk_create(new_statements)
+    TaskStatement.objects.bulk_update(updated_statements, fields=fields + ['text', 'examples'])
+    TaskStatement.objects.bulk_update(user_statements, fields=fields)
+    return {statement.task_id for statement in
+            new_statements + updated_statements + user_statements}
+
+
+def __get_tasks(keys):
+    """
+    Gets some tasks, by their (judge pk, task id) keys.
+    :return: a dict from the keys to the tasks (with their judges)
+    """
+    tasks = {(task.judge_id, task.task_id): task for task in Task.objects.filter(
+        judge__in={judge_pk for judge_pk, _ in keys},
+        task_id__in={task_id for _, task_id in keys}).select_related('judge')}
+    # The filter also matches task ids of the other judges.
+    return {key: task for key, task in tasks.items() if key in keys}
+
+
+def __write_task_chunk(task_infos, judges, task_tags):
+    """
+    Upserts a chunk of tasks, along with their statements, sources, tags and
+    judge statistics, in a few bulk statements.
+    :return: the tasks created, and the existing tasks that changed
+    """
+    # Keyed by (judge pk, task id); the last info of a task wins.
+    task_infos = {(judges[task_info['judge_id']].pk, task_info['task_id']): task_info
+                  for task_info in task_infos}
+    sources = __write_task_sources(task_infos.values(), judges)
+
+    tasks = __get_tasks(task_infos)
+    judges_by_pk = {judge.pk: judge for judge in judges.values()}
+    new_tasks = [Task(judge=judges_by_pk[judge_pk], task_id=task_id)
+                 for judge_pk, task_id in task_infos if (judge_pk, task_id) not in tasks]
+    if new_tasks:
+        # Another worker may create some of the tasks meanwhile. The pks are not
+        # set when ignoring conflicts, so the tasks are selected again, and only
+        # the ones created here (with our creation dates) are new.
+        Task.objects.bulk_create(new_tasks, ignore_conflicts=True)
+        created_at = {(task.judge_id, task.task_id): task.created_at for task in new_tasks}
+        new_tasks = []
+        for key, task in __get_tasks(created_at).items():
+            tasks[key] = task
+            if task.created_at == created_at[key]:
+                new_tasks.append(task)
+
+    changed_task_pks = __write_task_statements(
+        {key: task_info for key, task_info in task_infos.items()
+         if 'statement' in task_info}, tasks)
+    changed_tasks = []
+    modified_at = timezone.now()
+    for key, task_info in task_infos.items():
+        task = tasks[key]
+        source_id = task.source_id
+        if 'source' in task_info:
+            source_id = sources[(task.judge_id, slugify(task_info['source']))]
+        # Tasks are only written (and marked as modified) on actual changes.
+        if task.name != task_info['title'] or task.source_id != source_id or \
+                task.pk in changed_task_pks:
+            task.name = task_info['title']
+            task.source_id = source_id
+            task.modified_at = modified_at
+            changed_tasks.append(task)
+    Task.objects.bulk_update(changed_tasks, fields=['name', 'source', 'modified_at'])
+
+    task_tag_links = []
+    for key, task_info in task_infos.items():
         for tag_id in task_info.get('tags', []):
             if tag_id in task_tags:
-                task.tags.add(task_tags[tag_id])
+                task_tag_links.append(Task.tags.through(
+                    task_id=tasks[key].pk, methodtag_id=task_tags[tag_id].pk))
             else:
                 log.warning(f'Skipped adding tag {tag_id}. Does not exist')
+    Task.tags.through.objects.bulk_create(task_tag_links, ignore_conflicts=True)
 
-        if 'source' in task_info:
-            source_id = slugify(task_info['source'])
-            source, _ = TaskSource.objects.get_or_create(
-                judge=task.judge, source_id=source_id,
-                defaults={
-                    'name': task_info['source']})
-            task.source = source
-
-        task.save()
+    statistics = []
+    for key, task_info in task_infos.items():
         statistic_defaults = dict(
             total_submission_count=task_info.get('total_submission_count'),
             accepted_submission_count=task_info.get(
@@ -129,28 +503,92 @@ def write_tasks(tasks):
         )
         statistic_defaults = {k: v for k, v in statistic_defaults.items() if v}
         if len(statistic_defaults) > 0:
-            JudgeTaskStatistic.objects.get_or_create(
-                task=task, defaults=statistic_defaults)
+            statistics.append(JudgeTaskStatistic(task=tasks[key], **statistic_defaults))
+    # Existing statistics are kept as they are.
+    JudgeTaskStatistic.objects.bulk_create(statistics, ignore_conflicts=True)
+
+    new_task_pks = {task.pk for task in new_tasks}
+    return new_tasks, [task for task in changed_tasks if task.pk not in new_task_pks]
+
 
-    log.success(
-        f"Successfully updated {len(tasks)} tasks! ({total_created} created)")
+def write_tasks(tasks, chunk_size=TASK_CHUNK_SIZE):
+    """
+    Writes task infos (and statements) to the database, `chunk_size` at a
+    time, with a handful of bulk statements per chunk. Tasks that did not
+    change since the last scrape are not written.
+    :param tasks: list/generator of task infos
+    :param chunk_size: how many tasks to be written at once
+    :return: the number of tasks created, and of existing tasks that changed
+    """
+    task_tags = {tag.tag_id: tag for tag in MethodTag.objects.all()}
+    judges = {judge.judge_id: judge for judge in Judge.objects.all()}
+
+    total_updated = 0
+    total_created = 0
+    total_changed = 0
+    for chunk in split_into_chunks(tasks, chunk_size):
+        with transaction.atomic():
+            new_tasks, changed_tasks = __write_task_chunk(chunk, judges, task_tags)
+        # Bulk writes send no signals, but tasks need them (e.g. new ones to
+        # get their submissions scraped, changed ones to be reindexed).
+        for task in new_tasks:
+            post_save.send(sender=Task, instance=task, created=True,
+                           update_fields=None, raw=False, using=Task.objects.db)
+        for task in changed_tasks:
+            post_save.send(sender=Task, instance=task, created=False,
+                           update_fields=None, raw=False, using=Task.objects.db)
+        total_updated += len(chunk)
+        total_created += len(new_tasks)
+        total_changed += len(changed_tasks)
+
+    log.success(f"Successfully updated {total_updated} tasks! "
+                f"({total_created} created, {total_changed} changed)")
+    return total_created, total_changed
 
 
 def write_handles(handles_info):
+    """
+    Writes scraped handle infos (photo, names, rating) to the database.
+    Handles are found with a single query, and only the ones whose values
+    changed are written (with a single bulk update).
+    :param handles_info: list/generator of handle infos
+    """
     handles_info = list(handles_info)
+    if not handles_info:
+        log.info("No handles to update.")
+        return
+
+    handles_by_judge = {}
     for handle_info in handles_info:
-        try:
-            handle = UserHandle.objects.get(judge__judge_id=handle_info['judge_id'],
-                                            handle=handle_info['handle'])
-        except ObjectDoesNotExist:
+        handles_by_judge.setdefault(handle_info['judge_id'], set()).add(
+            handle_info['handle'].lower())
+    condition = Q()
+    for judge_id, handles in handles_by_judge.items():
+        condition |= Q(judge__judge_id=judge_id, handle_lower__in=handles)
+    handles = {(handle.judge.judge_id, handle.handle_lower): handle for handle in
+               UserHandle.objects.annotate(handle_lower=Lower('handle'))
+               .filter(condition).select_related('judge')}
+
+    changed_handles = {}
+    changed_fields = set()
+    for handle_info in handles_info:
+        handle = handles.get((handle_info['judge_id'], handle_info['handle'].lower()))
+        if handle is None:
             log.error(
                 f"Can't update handle: '{handle_info['handle']}': does not exist.")
             continue
 
-        if 'photo_url' in handle_info:
-            handle.photo_url = handle_info['photo_url']
-        else:
-            handle.photo_url = None
-        handle.save()
+        # A missing photo means the default one.
+        values = {'photo_url': handle_info.get('photo_url')}
+        values.update({field: handle_info[field] for field in HANDLE_INFO_FIELDS
+                       if field in handle_info})
+        for field, value in values.items():
+            if getattr(handle, field) != value:
+                setattr(handle, field, value)
+                changed_handles[handle.pk] = handle
+                changed_fields.add(field)
 
-    log.success(f"Successfully updated {len(handles_info)} handles!")
+    if changed_handles:
+        UserHandle.objects.bulk_update(changed_handles.values(), fields=sorted(changed_fields))
+    log.success(f"Successfully updated {len(handles_info)} handles! "
+                f"({len(changed_handles)} changed)")
@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+from core.logging import log
+from scraper import sessions
+
+KEY_PREFIX = 'scraper:ratelimit:'
+
+# Takes one token from the bucket in KEYS[1], refilling it first.
+# ARGV: rate (tokens per second), burst (bucket size), current time (seconds).
+# Returns {wait, reserved}: if the bucket is blocked (after backing off),
+# nothing is reserved and the caller should try again after `wait` seconds;
+# otherwise the token is reserved and may be used after `wait` seconds.
+RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_on', 'blocked_until')
+local tokens = tonumber(state[1]) or burst
+local updated_on = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+if blocked_until > now then
+    return {tostring(blocked_until - now), 0}
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated_on) * rate) - 1
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'updated_on', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+if tokens >= 0 then
+    return {'0', 1}
+end
+return {tostring(-tokens / rate), 1}
+"""
+
+# Blocks the bucket in KEYS[1] until ARGV[1] (seconds), unless it is
+# already blocked until later.
+BLOCK_SCRIPT = """
+local blocked_until = tonumber(ARGV[1])
+local current = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+if blocked_until > current then
+    redis.call('HSET', KEYS[1], 'blocked_until', tostring(blocked_until))
+end
+redis.call('EXPIRE', KEYS[1], math.ceil(blocked_until - tonumber(ARGV[2])) + 60)
+"""
+
+# How long to stick to the local buckets after Redis failed.
+REDIS_RETRY_SECONDS = 60
+
+
+class LocalBuckets:
+    """
+    In-process version of the Redis token buckets. Used when Redis is
+    unavailable (e.g. in local development), so the budget is only shared
+    between the threads of this process.
+    """
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def reserve(self, key, rate, burst, now):
+        with self.lock:
+            bucket = self.buckets.setdefault(key, {})
+            blocked_until = bucket.get('blocked_until', 0)
+            if blocked_until > now:
+                return blocked_until - now, False
+            tokens = bucket.get('tokens', burst)
+            updated_on = bucket.get('updated_on', now)
+            tokens = min(burst, tokens + max(0, now - updated_on) * rate) - 1
+            bucket.update(tokens=tokens, updated_on=now)
+            return max(0, -tokens / rate), True
+
+    def block(self, key, blocked_until, now):
+        with self.lock:
+            bucket = self.buckets.setdefault(key, {})
+            bucket['blocked_until'] = max(bucket.get('blocked_until', 0), blocked_until)
+
+
+class RedisBuckets:
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.reserve_script = self.client.register_script(RESERVE_SCRIPT)
+        self.block_script = self.client.register_script(BLOCK_SCRIPT)
+
+    def reserve(self, key, rate, burst, now):
+        wait, reserved = self.reserve_script(keys=[key], args=[rate, burst, now])
+        return float(wait), bool(reserved)
+
+    def block(self, key, blocked_until, now):
+        self.block_script(keys=[key], args=[blocked_until, now])
+
+
+__local_buckets = LocalBuckets()
+__redis_buckets = None
+__redis_failed_on = None
+__lock = threading.Lock()
+
+
+def __get_redis_buckets():
+    global __redis_buckets
+    with __lock:
+        if __redis_failed_on and time.time() - __redis_failed_on < REDIS_RETRY_SECONDS:
+            return None
+        if __redis_buckets is None:
+            url = getattr(settings, 'SCRAPER_RATE_LIMIT_REDIS_URL', None) or \
+                  getattr(settings, 'CELERY_BROKER_URL', None)
+            if not url or not url.startswith('redis'):
+                return None
+            __redis_buckets = RedisBuckets(url)
+        return __redis_buckets
+
+
+def __call(method, *args):
+    global __redis_failed_on
+    buckets = __get_redis_buckets()
+    if buckets is not None:
+        try:
+            return getattr(buckets, method)(*args)
+        except redis.exceptions.RedisError as ex:
+            log.warning(f"Redis rate limiter unavailable ({ex}). "
+                        f"Falling back to local rate limiting...")
+            __redis_failed_on = time.time()
+    return getattr(__local_buckets, method)(*args)
+
+
+def acquire(judge_id: str):
+    """
+    Waits until a request to the judge is allowed by its token bucket.
+    The bucket is refilled with RATE tokens per second, up to BURST tokens
+    (both options of settings.SCRAPER_HTTP), and is shared through Redis by
+    all the processes scraping the judge.
+    :param judge_id: the id of the judge (e.g. 'cf')
+    """
+    rate = sessions.get_option(judge_id, 'RATE')
+    burst = sessions.get_option(judge_id, 'BURST')
+    while True:
+        wait, reserved = __call('reserve', KEY_PREFIX + judge_id, rate, burst, time.time())
+        if wait > 0:
+            log.debug(f"Rate limited on '{judge_id}': waiting {wait:.2f}s...")
+            time.sleep(wait)
+        if reserved:
+            return
+
+
+def get_backoff_delay(judge_id: str, tries: int, retry_after=None) -> float:
+    """
+    Computes the delay before retrying a failed request: exponential in the
+    number of tries (starting at BACKOFF_BASE seconds, capped at BACKOFF_CAP),
+    with random jitter, so that retrying clients do not fire all at once.
+    A numeric Retry-After header sent by the judge takes precedence.
+    """
+    if retry_after is not None and str(retry_after).isdigit():
+        return float(retry_after)
+    delay = min(sessions.get_option(judge_id, 'BACKOFF_CAP'),
+                sessions.get_option(judge_id, 'BACKOFF_BASE') * 2 ** tries)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def back_off(judge_id: str, tries: int, retry_after=None) -> float:
+    """
+    Blocks all requests to the judge (from every process) for a while,
+    after the judge failed a request (e.g. with 429 or 5xx).
+    :return: the number of seconds the judge is blocked for
+    """
+    delay = get_backoff_delay(judge_id, tries, retry_after)
+    now = time.time()
+    __call('block', KEY_PREFIX + judge_id, now + delay, now)
+    return delay
@@ -0,0 +1,143 @@
+import base64
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from scraper import sessions
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+# The stored body is already decoded, so these would not describe it anymore.
+DROPPED_HEADERS = ['Content-Encoding', 'Transfer-Encoding']
+
+__adapter = None
+__lock = threading.Lock()
+
+
+class FixtureNotFound(Exception):
+    """ Raised when replaying a request that was never recorded. """
+    pass
+
+
+def get_fixture_path(directory: str, method: str, url: str) -> str:
+    key = hashlib.sha1(f"{method.upper()} {url}".encode()).hexdigest()
+    return os.path.join(directory, sessions.get_judge_id(url), key + '.json')
+
+
+def store_fixture(directory: str, method: str, url: str, status_code: int,
+                  content: bytes, headers: dict = None, encoding: str = None):
+    """
+    Saves a response to a fixture file, to be replayed later.
+    :param directory: the root directory of the fixtures
+    :param method: the method of the request (e.g. 'GET')
+    :param url: the url of the request (including the query string)
+    """
+    path = get_fixture_path(directory, method, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fixture = {
+        'method': method.upper(),
+        'url': url,
+        'status_code': status_code,
+        'encoding': encoding,
+        'headers': {name: value for name, value in (headers or {}).items()
+                    if name.title() not in DROPPED_HEADERS},
+        'content': base64.b64encode(content).decode(),
+    }
+    with open(path, 'w') as f:
+        json.dump(fixture, f, indent=2)
+
+
+def load_fixture(directory: str, method: str, url: str) -> requests.Response:
+    path = get_fixture_path(directory, method, url)
+    try:
+        with open(path, 'r') as f:
+            fixture = json.load(f)
+    except (OSError, ValueError):
+        raise FixtureNotFound(f"No fixture for {method.upper()} {url} (expected at {path})")
+
+    response = requests.Response()
+    response.status_code = fixture['status_code']
+    response.url = fixture['url']
+    response.encoding = fixture['encoding']
+    response.headers = CaseInsensitiveDict(fixture['headers'])
+    response._content = base64.b64decode(fixture['content'])
+    return response
+
+
+class FixtureAdapter(HTTPAdapter):
+    """
+    Transport adapter that either records the responses of the judges
+    to fixture files (while still sending the requests), or replays
+    them from the fixture files without any network access.
+    """
+    def __init__(self, directory: str, mode: str, **kwargs):
+        super().__init__(**kwargs)
+        if mode not in [RECORD, REPLAY]:
+            raise ValueError(f"Invalid fixture mode: '{mode}'")
+        self.directory = directory
+        self.mode = mode
+        # Number of requests sent (and of those missing a fixture), by judge id.
+        self.request_count = collections.Counter()
+        self.missing_count = collections.Counter()
+        # Fresh session (no cookies of earlier live requests) using this adapter.
+        self.session = requests.Session()
+        self.session.mount('http://', self)
+        self.session.mount('https://', self)
+
+    def send(self, request, **kwargs):
+        judge_id = sessions.get_judge_id(request.url)
+        self.request_count[judge_id] += 1
+        if self.mode == REPLAY:
+            try:
+                response = load_fixture(self.directory, request.method, request.url)
+            except FixtureNotFound:
+                # Some scrapers swallow errors, so keep track of them here too.
+                self.missing_count[judge_id] += 1
+                raise
+            response.request = request
+            return response
+
+        response = super().send(request, **kwargs)
+        store_fixture(self.directory, request.method, request.url,
+                      response.status_code, response.content,
+                      headers=response.headers, encoding=response.encoding)
+        return response
+
+
+def get_adapter():
+    """
+    :return: the FixtureAdapter all the requests go through, or None
+    if the judges are reached directly
+    """
+    return __adapter
+
+
+@contextlib.contextmanager
+def use_fixtures(directory: str, mode: str):
+    """
+    Sends all the scraper requests (see sessions.request()) through
+    a FixtureAdapter, for the duration of the block.
+    In REPLAY mode, requests that were never recorded raise FixtureNotFound.
+    :param directory: the root directory of the fixtures
+    :param mode: either RECORD or REPLAY
+    :return: the adapter (with its per-judge request counts)
+    """
+    global __adapter
+    adapter = FixtureAdapter(directory, mode)
+    with __lock:
+        if __adapter is not None:
+            raise RuntimeError("Fixtures are already in use.")
+        __adapter = adapter
+    try:
+        yield adapter
+    finally:
+        with __lock:
+            __adapter = None
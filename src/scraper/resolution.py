@@ -0,0 +1,85 @@
+import threading
+import time
+
+from django.db.models.functions import Lower
+
+from data.models import UserHandle, Task
+from scraper import sessions
+
+
+class ResolutionCache:
+    """
+    Maps (judge id, key) pairs to primary keys, e.g. ('cf', 'tourist') to
+    the id of the UserHandle. Keys missing from the database are cached too,
+    as most scraped authors (e.g. of recent submissions) are not tracked.
+    Entries are forgotten when the rows are saved or deleted in this process
+    (see data.signals), or after RESOLUTION_TTL seconds (an option of
+    settings.SCRAPER_HTTP), for changes made by other processes.
+    """
+    def __init__(self, load):
+        """
+        :param load: function getting a dict from keys to primary keys,
+        given a judge id and some keys (the ones found in the database)
+        """
+        self.load = load
+        self.entries = {}
+        self.keys_by_pk = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, judge_id, keys):
+        """
+        :return: a dict from keys to primary keys, for the keys found
+        """
+        now = time.time()
+        ttl = sessions.get_option(judge_id, 'RESOLUTION_TTL')
+        found, missing = {}, set()
+        with self.lock:
+            for key in set(keys):
+                pk, stored_on = self.entries.get((judge_id, key), (None, None))
+                if stored_on is None or now - stored_on >= ttl:
+                    missing.add(key)
+                elif pk is not None:
+                    found[key] = pk
+
+        if missing:
+            loaded = self.load(judge_id, missing)
+            with self.lock:
+                for key in missing:
+                    pk = loaded.get(key)
+                    self.entries[(judge_id, key)] = (pk, now)
+                    if pk is not None:
+                        self.keys_by_pk[pk] = (judge_id, key)
+            found.update(loaded)
+        return found
+
+    def forget(self, judge_id, keys=(), pk=None):
+        """
+        Forgets some keys, and the key the primary key `pk` was cached under
+        (e.g. the old name of a renamed handle).
+        """
+        with self.lock:
+            for key in keys:
+                self.entries.pop((judge_id, key), None)
+            if pk is not None and pk in self.keys_by_pk:
+                self.entries.pop(self.keys_by_pk.pop(pk), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_pk.clear()
+
+
+def __load_handles(judge_id, handles):
+    return dict(UserHandle.objects.annotate(handle_lower=Lower('handle'))
+                .filter(judge__judge_id=judge_id, handle_lower__in=handles)
+                .values_list('handle_lower', 'id'))
+
+
+def __load_tasks(judge_id, task_ids):
+    return dict(Task.objects.filter(judge__judge_id=judge_id, task_id__in=task_ids)
+                .values_list('task_id', 'id'))
+
+
+# Keyed by lowercase handles.
+handles = ResolutionCache(__load_handles)
+tasks = ResolutionCache(__load_tasks)
@@ -1,4 +1,8 @@
+import threading
+import time
+
 from core.logging import log
+from scraper import sessions
 from .scraper import Scraper
 from .infoarena.scraper import InfoarenaScraper
 from .codeforces.scraper import CodeforcesScraper
@@ -17,9 +21,32 @@ __SUBMISSION_SCRAPERS__ = [
 ]
 
 
+__scrapers = {}
+# Scrapers bootstrap over HTTP when created, so each judge has its own lock:
+# a slow (or down) judge does not hold up the scrapers of the others.
+__judge_locks = {}
+__lock = threading.Lock()
+
+
 def create_scraper(judge_id: str) -> Scraper:
-    for scraper_kls in __SUBMISSION_SCRAPERS__:
-        if scraper_kls.JUDGE_ID == judge_id:
-            log.debug(f"Found scraper for judge '{judge_id}': {scraper_kls.__name__}")
-            return scraper_kls()
-    raise Exception(f"No scraper configured for {judge_id}.")
\ No newline at end of file
+    """
+    Gets the scraper of a judge. Scrapers are shared by the whole process
+    (across services and Celery tasks) for SCRAPER_TTL seconds, so that their
+    bootstrap state (e.g. CSRF tokens, task maps) is not fetched every time.
+    """
+    with __lock:
+        judge_lock = __judge_locks.setdefault(judge_id, threading.Lock())
+
+    with judge_lock:
+        scraper, created_on = __scrapers.get(judge_id, (None, None))
+        if scraper is not None and \
+                time.time() - created_on < sessions.get_option(judge_id, 'SCRAPER_TTL'):
+            return scraper
+
+        for scraper_kls in __SUBMISSION_SCRAPERS__:
+            if scraper_kls.JUDGE_ID == judge_id:
+                log.debug(f"Found scraper for judge '{judge_id}': {scraper_kls.__name__}")
+                scraper = scraper_kls()
+                __scrapers[judge_id] = (scraper, time.time())
+                return scraper
+    raise Exception(f"No scraper configured for {judge_id}.")
@@ -7,6 +7,7 @@ import datetime
 import re
 
 from core.logging import log
+from scraper import parsing
 from scraper.utils import get_page
 from .parsers import parse_title, parse_time_limit, parse_memory_limit
 
@@ -50,8 +51,7 @@ def scrape_submissions_for_contest(contest_id, query_dict, from_page=1, to_page=
     for page_id in range(from_page, to_page + 1):
         page_url = f"{base_url}submissions"
         page = get_page(page_url, page=page_id, **query_dict)
-        soup = BeautifulSoup(page.content, 'html.parser')
-        rows = __scrape_table_rows(soup.select_one(".panel-submission"),
+        rows = __scrape_table_rows(parsing.select_one(page.content, ".panel-submission"),
                                    table_css_selector="table")
         submission_found = False
 
@@ -70,6 +70,7 @@ def scrape_submissions_for_contest(contest_id, query_dict, from_page=1, to_page=
                 'language': row[3].text,
                 'source_size': int(row[5].text.split()[0]),
                 'verdict': row[6].select_one('span.label').text.split()[-1],
+                'page_id': page_id,
             }
 
             if row[4].text != '-':
@@ -128,15 +129,16 @@ def scrape_submissions_for_user(user_id, contest_ids):
             yield submission
 
 
-def scrape_submissions_for_task(task_id):
+def scrape_submissions_for_task(task_id, from_page=1):
     """
     Scrapes all submissions for a given task.
     :param task_id: the id of the task (e.g. 'agc003_a')
+    :param from_page: the page from which to start
     :return: a generator of submission objects
     """
     contest_id, task_id = task_id.split('/')
     return scrape_submissions_for_contest(
-        contest_id, {"f.Task": task_id})
+        contest_id, {"f.Task": task_id}, from_page=from_page)
 
 
 def scrape_task_info(task_id: str):
@@ -147,7 +149,7 @@ def scrape_task_info(task_id: str):
     """
     contest_id, task_id = task_id.split('/')
     page_url = f"https://atcoder.jp/contests/{contest_id}/tasks/{task_id}"
-    page = get_page(page_url)
+    page = get_page(page_url, use_cache=True)
     soup = BeautifulSoup(page.content, 'html.parser')
     main_div = soup.select_one('span.h2').parent
     time_limit_text, memory_limit_text = map(str.strip, main_div.select_one('p').text.split('/'))
@@ -1,3 +1,4 @@
+from core.logging import log
 from scraper.scrapers import Scraper
 from . import utils
 
@@ -8,8 +9,8 @@ class CodeforcesScraper(Scraper):
     def scrape_recent_submissions(self):
         return utils.scrape_recent_submissions()
 
-    def scrape_submissions_for_task(self, task_id):
-        return utils.scrape_submissions_for_task(task_id)
+    def scrape_submissions_for_task(self, task_id, from_page=1):
+        return utils.scrape_submissions_for_task(task_id, from_page=from_page)
 
     def scrape_submissions_for_user(self, user_id):
         return utils.scrape_submissions_for_user(user_id)
@@ -17,6 +18,31 @@ class CodeforcesScraper(Scraper):
     def scrape_task_info(self, task_id):
         return utils.scrape_task_info(task_id)
 
+    def scrape_task_infos(self, task_ids):
+        found = {}
+        scraped_contest_ids = set()
+        if len({task_id.split('/')[0] for task_id in task_ids}) > 1:
+            # The whole problemset comes in one request.
+            for task_info in utils.scrape_problemset_task_infos():
+                found[task_info['task_id']] = task_info
+
+        task_infos = {}
+        for task_id in task_ids:
+            # Gym tasks (or tasks of contests too new for the problemset)
+            # are scraped a contest at a time.
+            contest_id = task_id.split('/')[0]
+            if task_id.lower() not in found and contest_id not in scraped_contest_ids:
+                scraped_contest_ids.add(contest_id)
+                for task_info in utils.scrape_contest_task_infos(contest_id):
+                    found[task_info['task_id']] = task_info
+
+            task_info = found.get(task_id.lower())
+            if task_info is None:
+                log.warning(f"Did not find task info for '{task_id}'. Skipping...")
+                continue
+            task_infos[task_id] = task_info
+        return task_infos
+
     def scrape_user_info(self, handle: str):
         # Codeforces has support for multiple handles.
         result = utils.scrape_user_info([handle])
@@ -25,5 +51,8 @@ class CodeforcesScraper(Scraper):
 
         return None if len(result) == 0 else result[0]
 
+    def scrape_user_infos(self, handles):
+        return utils.scrape_user_info(handles)
+
     def scrape_task_statement(self, task_id):
         return utils.scrape_task_statement(task_id)
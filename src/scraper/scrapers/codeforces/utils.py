@@ -13,15 +13,26 @@ from scraper.scrapers.codeforces.parsers import \
 from scraper.utils import get_page, split_into_chunks
 
 
-def _api_get(api_method: str, kwargs) -> Any:
+# Maximum number of handles in a user.info call. The API accepts more,
+# but the url would get too long.
+USER_INFO_BATCH_SIZE = 500
+
+
+def _api_call(api_method: str, kwargs) -> Any:
     page_url = f"https://codeforces.com/api/{api_method}"
     try:
         response = get_page(page_url, **kwargs)
     except Exception as ex:
         log.error(f"GET request got exception: {ex}")
+        return None
+    return response.json()
+
+
+def _api_get(api_method: str, kwargs) -> Any:
+    json_data = _api_call(api_method, kwargs)
+    if json_data is None:
         return []
 
-    json_data = response.json()
     status = json_data['status']
     if status != 'OK':
         log.error(f"Codeforces API error "
@@ -46,10 +57,10 @@ def scrape_submissions_for_tasks(task_ids, count=200):
     return heapq.merge(*submissions, key=lambda x: x['submitted_on'], reverse=True)
 
 
-def scrape_submissions_for_task(task_id, count=1000):
+def scrape_submissions_for_task(task_id, count=1000, from_page=1):
     contest_id = task_id.split('/')[0]
 
-    id_from = 1
+    id_from = (from_page - 1) * count + 1
     found = True
     while found:
         found = False
@@ -71,6 +82,7 @@ def scrape_submissions_for_task(task_id, count=1000):
                 continue
 
             for submission in parse_submission(submission_data):
+                submission['page_id'] = (id_from - 1) // count + 1
                 yield submission
         id_from += count
 
@@ -97,6 +109,60 @@ def scrape_submissions_for_user(handle, count=200):
         id_from += count
 
 
+def __parse_task_info(task_data, contest_data):
+    tags = []
+    for tag_data in task_data['tags']:
+        tag = parse_tag(tag_data)
+        if tag:
+            tags.append(tag)
+    task_info = {
+        'judge_id': CODEFORCES_JUDGE_ID,
+        'task_id': '/'.join([str(task_data['contestId']), task_data['index']]).lower(),
+        'title': task_data['name'],
+        'tags': tags,
+    }
+    if contest_data:
+        task_info['source'] = contest_data['name']
+        creation_time_seconds = contest_data.get('startTimeSeconds')
+        if creation_time_seconds:
+            task_info['first_submitted_on'] = datetime.datetime.utcfromtimestamp(
+                creation_time_seconds)
+    return task_info
+
+
+def scrape_contest_task_infos(contest_id: str):
+    """
+    Scrapes task information for all the tasks of a contest.
+    :param contest_id: the id of the contest (e.g. '1234')
+    :return: a list of task infos
+    """
+    # Only the problems are needed, not the standings rows.
+    response = _api_get('contest.standings', kwargs={
+        'contestId': contest_id,
+        'from': 1,
+        'count': 1,
+    })
+    if not response:
+        return []
+    return [__parse_task_info(task_data, response['contest'])
+            for task_data in response['problems']]
+
+
+def scrape_problemset_task_infos():
+    """
+    Scrapes task information for all the tasks in the problemset
+    (gym tasks are not part of it), with two API calls.
+    :return: a list of task infos
+    """
+    response = _api_get('problemset.problems', kwargs={})
+    if not response:
+        return []
+    contests = {contest_data['id']: contest_data
+                for contest_data in _api_get('contest.list', kwargs={'gym': 'false'})}
+    return [__parse_task_info(task_data, contests.get(task_data['contestId']))
+            for task_data in response['problems'] if 'contestId' in task_data]
+
+
 def scrape_task_info(task_id: str):
     """
     Scrapes task information for given task ids.
@@ -104,61 +170,65 @@ def scrape_task_info(task_id: str):
     :return: task information, in dict format
     """
     contest_id = task_id.split('/')[0]
-    response = _api_get('contest.standings', kwargs={'contestId': contest_id})
+    for task_info in scrape_contest_task_infos(contest_id):
+        if task_info['task_id'] == task_id.lower():
+            log.info(f"Updating task '{task_id}' [{task_info['title']}]...")
+            return task_info
 
-    found = False
-    for task_data in response['problems']:
-        curr_task_id = '/'.join([str(task_data['contestId']),
-                                 task_data['index']]).lower()
-        if task_id != curr_task_id:
-            continue
-
-        log.info(f"Updating task '{task_id}' [{task_data['name']}]...")
-
-        tags = []
-        for tag_data in task_data['tags']:
-            tag = parse_tag(tag_data)
-            if tag:
-                tags.append(tag)
-        task_info = {
-            'judge_id': CODEFORCES_JUDGE_ID,
-            'task_id': task_id.lower(),
-            'title': task_data['name'],
-            'tags': tags,
-            'source': response['contest']['name'],
-        }
-        creation_time_seconds = response['contest'].get('startTimeSeconds')
-        if creation_time_seconds:
-            task_info['first_submitted_on'] = datetime.datetime.utcfromtimestamp(
-                creation_time_seconds)
-        found = True
-        return task_info
-
-    if not found:
-        log.warning(f"Task id '{task_id}' not found.")
-        return None
+    log.warning(f"Task id '{task_id}' not found.")
+    return None
 
 
-def scrape_user_info(handles):
+def __parse_user_data(user_data):
+    info = {
+        'judge_id': CODEFORCES_JUDGE_ID,
+        'handle': user_data['handle'].lower(),
+    }
+    if 'titlePhoto' in user_data and not user_data['titlePhoto'].endswith('no-title.jpg'):
+        info['photo_url'] = 'https:' + user_data['titlePhoto']
+    if 'firstName' in user_data:
+        info['first_name'] = user_data['firstName']
+    if 'lastName' in user_data:
+        info['last_name'] = user_data['lastName']
+    if 'rating' in user_data:
+        info['rating'] = user_data['rating']
+    return info
+
+
+def __scrape_user_data(handles):
+    handles = list(handles)
+    while handles:
+        json_data = _api_call('user.info', kwargs={'handles': ';'.join(handles)})
+        if json_data is None:
+            return []
+        if json_data['status'] == 'OK':
+            return json_data['result']
+
+        # The whole call fails if any of the handles does not exist.
+        comment = json_data.get('comment') or ''
+        match = re.search(r'User with handle (\S+) not found', comment)
+        if match is None:
+            log.error(f"Codeforces API error (message: '{comment}')")
+            return []
+        log.warning(f"Codeforces handle '{match.group(1)}' not found. Skipping...")
+        remaining = [handle for handle in handles
+                     if handle.lower() != match.group(1).lower()]
+        if len(remaining) == len(handles):
+            return []
+        handles = remaining
+    return []
+
+
+def scrape_user_info(handles, batch_size=USER_INFO_BATCH_SIZE):
     """
     Scrapes user information from the website.
+    Handles are sent `batch_size` at a time, in a single API call.
     :param handles: a list of codeforces handles
     """
-    response = _api_get('user.info', kwargs={'handles': ';'.join(handles)})
     user_infos = []
-    for user_data in response:
-        info = {
-            'judge_id': CODEFORCES_JUDGE_ID,
-            'handle': user_data['handle'].lower(),
-        }
-        if 'titlePhoto' in user_data and not user_data['titlePhoto'].endswith('no-title.jpg'):
-            info['photo_url'] = 'https:' + user_data['titlePhoto']
-        if 'firstName' in user_data:
-            info['first_name'] = user_data['firstName']
-        if 'lastName' in user_data:
-            info['last_name'] = user_data['lastName']
-
-        user_infos.append(info)
+    for batch in split_into_chunks(handles, batch_size):
+        for user_data in __scrape_user_data(batch):
+            user_infos.append(__parse_user_data(user_data))
     return user_infos
 
 
@@ -166,7 +236,8 @@ def scrape_task_statement(task_id: str):
     contest_id, task_letter = task_id.split('/')
     contest_or_gym = "gym" if int(contest_id) >= 100000 else "contest"
     response = get_page(
-        f"https://codeforces.com/{contest_or_gym}/{contest_id}/problem/{task_letter}")
+        f"https://codeforces.com/{contest_or_gym}/{contest_id}/problem/{task_letter}",
+        use_cache=True)
     soup = BeautifulSoup(response.text, 'html.parser')
     statement = soup.select_one(".problem-statement")
     result = ""
@@ -11,7 +11,8 @@ class CSAcademyScraper(Scraper):
         self.task_name_dict = utils.get_task_name_dict(self.csrf_token)
         self.all_task_info = None
 
-    def scrape_submissions_for_task(self, task_id):
+    def scrape_submissions_for_task(self, task_id, from_page=1):
+        # Not paginated: all the submissions come in one request.
         # CSAcademy has their own task ids that are numerical and are kept inside
         # a global map. We keep `task_id` as a parameter for consistency.
         return utils.scrape_submissions(self.csrf_token, self.task_name_dict,
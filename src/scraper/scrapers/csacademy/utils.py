@@ -1,10 +1,9 @@
 import datetime
 import heapq
-
-import requests
 import json
 
 from core.logging import log
+from scraper import sessions
 
 CSACADEMY_JUDGE_ID = 'csa'
 CONTESTS = [('archive', 1), ('interview-archive', 136)]
@@ -36,7 +35,7 @@ def __get_cookies(csrf_token):
 def get_task_info(csrf_token):
     task_info = []
     for archive, contest_id in CONTESTS:
-        response = requests.get(f'https://csacademy.com/contest/{archive}/tasks/?',
+        response = sessions.get(f'https://csacademy.com/contest/{archive}/tasks/?',
                                 headers=__get_headers(csrf_token), cookies=__get_cookies(csrf_token))
         json_data = json.loads(response.text)
         task_info.extend([
@@ -64,7 +63,7 @@ def get_eval_jobs(csrf_token, user_id, task_id, from_date, num_jobs=1000):
     ]
     params = [p for p in params if p[1] is not None]
 
-    response = requests.get('https://csacademy.com/eval/get_eval_jobs/',
+    response = sessions.get('https://csacademy.com/eval/get_eval_jobs/',
                             headers=__get_headers(csrf_token),
                             params=params, cookies=__get_cookies(csrf_token))
     json_data = json.loads(response.text)
@@ -74,7 +73,7 @@ def get_eval_jobs(csrf_token, user_id, task_id, from_date, num_jobs=1000):
 
 
 def get_csrf_token():
-    response = requests.get('https://csacademy.com/')
+    response = sessions.get('https://csacademy.com/')
     csrf_token = response.cookies['csrftoken']
     log.debug('Got csrf token: {}'.format(csrf_token))
     return csrf_token
@@ -184,7 +183,7 @@ def scrape_submissions(csrf_token, task_name_dict, task_name=None, username=None
 
     user_id = None
     if username:
-        response = requests.get(f'https://csacademy.com/user/{username}/',
+        response = sessions.get(f'https://csacademy.com/user/{username}/',
                                 headers=__get_headers(csrf_token), cookies=__get_cookies(csrf_token))
         json_data = json.loads(response.text)
         if json_data.get('error'):
@@ -11,13 +11,13 @@ class InfoarenaScraper(Scraper):
     JUDGE_ID = utils.INFOARENA_JUDGE_ID
 
     def __init__(self):
-        self.default_avatar = utils.get_default_avatar()
+        self.default_avatar_hash = utils.get_default_avatar_hash()
 
     def scrape_submissions_for_user(self, user_id):
         return utils.scrape_submissions(user=user_id)
 
-    def scrape_submissions_for_task(self, task_id):
-        return utils.scrape_submissions(task=task_id)
+    def scrape_submissions_for_task(self, task_id, from_page=1):
+        return utils.scrape_submissions(from_page=from_page, task=task_id)
 
     def scrape_recent_submissions(self):
         return utils.scrape_submissions()
@@ -26,7 +26,7 @@ class InfoarenaScraper(Scraper):
         return utils.scrape_task_info(task_id)
 
     def scrape_user_info(self, handle):
-        return utils.scrape_user_info(handle, self.default_avatar)
+        return utils.scrape_user_info(handle, self.default_avatar_hash)
 
     def scrape_task_statement(self, task_id):
         statement = utils.scrape_task_statement(task_id)
@@ -1,3 +1,4 @@
+import hashlib
 import re
 import string
 
@@ -5,6 +6,7 @@ from bs4 import BeautifulSoup
 
 from core import markdown
 from core.logging import log
+from scraper import parsing, queries
 from scraper.utils import get_page
 from scraper.scrapers.infoarena import parsers
 from html2text import html2text
@@ -30,8 +32,7 @@ def __scrape_paginated_table_rows(page_url, from_page, to_page, results_per_page
         page = get_page(page_url, **query_dict,
                         first_entry=first_entry,
                         display_entries=results_per_page)
-        soup = BeautifulSoup(page.content, 'html.parser')
-        table = soup.select_one(table_css_selector)
+        table = parsing.select_one(page.content, table_css_selector)
         if table is None:
             break
         if "Nici o solutie" in table.text:
@@ -39,7 +40,7 @@ def __scrape_paginated_table_rows(page_url, from_page, to_page, results_per_page
 
         rows = table.find_all("tr")[1:]
         for row in rows:
-            yield row.find_all("td")
+            yield page_id, row.find_all("td")
 
 
 def scrape_submissions(from_page=1, to_page=SCRAPER_LIMIT, results_per_page=200, **query_dict):
@@ -53,7 +54,7 @@ def scrape_submissions(from_page=1, to_page=SCRAPER_LIMIT, results_per_page=200,
     page_url = "https://www.infoarena.ro/monitor"
     rows = __scrape_paginated_table_rows(page_url, from_page, to_page, results_per_page,
                                          table_css_selector="#monitor-table", **query_dict)
-    for row in rows:
+    for page_id, row in rows:
         if len(row) != 7:
             raise Exception("Unexpected number of columns.")
         # Parse required information.
@@ -76,6 +77,7 @@ def scrape_submissions(from_page=1, to_page=SCRAPER_LIMIT, results_per_page=200,
                 submitted_on=parsers.parse_date(row[5].text),
                 verdict=parsers.parse_verdict(verdict_text),
                 score=parsers.parse_score(verdict_text),
+                page_id=page_id,
             )
             yield submission
         except (TypeError, AttributeError) as e:
@@ -86,8 +88,7 @@ def scrape_submissions(from_page=1, to_page=SCRAPER_LIMIT, results_per_page=200,
 def get_submission_count(**query_dict):
     page_url = f"https://www.infoarena.ro/monitor"
     page = get_page(page_url, **query_dict)
-    soup = BeautifulSoup(page.content, 'html.parser')
-    submision_count_text = soup.select_one('#monitor-table .pager .count').text
+    submision_count_text = parsing.select_one(page.content, '#monitor-table .pager .count').text
     submission_count = parsers.parse_submission_count(submision_count_text)
     return submission_count
 
@@ -104,7 +105,7 @@ def scrape_task_ids(page_name, from_page=1, to_page=SCRAPER_LIMIT, results_per_p
     page_url = "https://www.infoarena.ro/" + page_name
     rows = __scrape_paginated_table_rows(page_url, from_page, to_page, results_per_page,
                                          table_css_selector=".tasks")
-    for row in rows:
+    for _, row in rows:
         task_id = row[1].find("a", href=True)['href'].split('/')[-1]
         yield task_id
 
@@ -116,7 +117,7 @@ def scrape_task_info(task_id):
     :return: task information, in dict format
     """
     page_url = "https://www.infoarena.ro/problema/" + task_id
-    page = get_page(page_url)
+    page = get_page(page_url, use_cache=True)
     soup = BeautifulSoup(page.content, 'html.parser')
 
     main_view = soup.find(id='main')
@@ -174,15 +175,43 @@ def __get_avatar_url(handle):
     return "https://www.infoarena.ro/avatar/full/" + handle
 
 
-def get_default_avatar():
-    return get_page(__get_avatar_url(USER_WITH_DEFAULT_AVATAR)).content
+def __get_avatar_hash(handle):
+    """
+    Gets the sha1 of the avatar of a handle. The avatar is downloaded only if
+    it changed since the last time (as told by a conditional GET), otherwise
+    the stored hash is used. Without validators, it is always downloaded.
+    """
+    avatar_url = __get_avatar_url(handle)
+    info = queries.get_avatar_info(avatar_url)
+    headers = {}
+    if info is not None:
+        if info.etag:
+            headers['If-None-Match'] = info.etag
+        if info.last_modified:
+            headers['If-Modified-Since'] = info.last_modified
+
+    response = get_page(avatar_url, headers=headers)
+    if response.status_code == 304 and info is not None:
+        return info.sha1
+
+    sha1 = hashlib.sha1(response.content).hexdigest()
+    if response.status_code == 200:
+        queries.write_avatar_info(
+            avatar_url, sha1,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'))
+    return sha1
+
+
+def get_default_avatar_hash():
+    return __get_avatar_hash(USER_WITH_DEFAULT_AVATAR)
 
 
-def scrape_user_info(handle, default_avatar):
+def scrape_user_info(handle, default_avatar_hash):
     """
     Scrapes user information for given handles.
     :param handle: the handle of infoarena user
-    :param default_avatar: obtainable from get_default_avatar()
+    :param default_avatar_hash: obtainable from get_default_avatar_hash()
     :return: user information, in dict format
     """
 
@@ -217,8 +246,7 @@ def scrape_user_info(handle, default_avatar):
     if avatar_url.lower() != f'/avatar/full/{handle.lower()}':
         raise Exception('Avatar url is not as expected.')
 
-    user_avatar = get_page(__get_avatar_url(handle)).content
-    if user_avatar == default_avatar:
+    if __get_avatar_hash(handle) == default_avatar_hash:
         user_info['photo_url'] = None
     else:
         user_info['photo_url'] = __get_avatar_url(handle)
@@ -226,7 +254,7 @@ def scrape_user_info(handle, default_avatar):
 
 
 def scrape_task_statement(task_id: str):
-    response = get_page(f"https://www.infoarena.ro/problema/{task_id}")
+    response = get_page(f"https://www.infoarena.ro/problema/{task_id}", use_cache=True)
     soup = BeautifulSoup(response.text, 'html.parser')
     text_block = soup.select_one("#main > .wiki_text_block")
 
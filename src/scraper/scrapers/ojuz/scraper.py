@@ -8,8 +8,8 @@ class OjuzScraper(Scraper):
     def scrape_submissions_for_user(self, user_id):
         return utils.scrape_submissions(user=user_id)
 
-    def scrape_submissions_for_task(self, task_id):
-        return utils.scrape_submissions(problem=task_id)
+    def scrape_submissions_for_task(self, task_id, from_page=1):
+        return utils.scrape_submissions(from_page=from_page, problem=task_id)
 
     def scrape_recent_submissions(self):
         return utils.scrape_submissions()
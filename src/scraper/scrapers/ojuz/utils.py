@@ -1,6 +1,7 @@
 from bs4 import BeautifulSoup
 
 from core.logging import log
+from scraper import parsing
 from scraper.scrapers.ojuz import parsers
 from scraper.utils import get_page
 
@@ -12,14 +13,13 @@ def __scrape_paginated_table_rows(page_url, from_page, to_page, table_css_select
     for page_id in range(from_page, to_page + 1):
         page = get_page(page_url, **query_dict,
                         page=page_id)
-        soup = BeautifulSoup(page.content, 'html.parser')
-        table = soup.select_one(table_css_selector)
+        table = parsing.select_one(page.content, table_css_selector)
 
         rows = table.find_all("tr")[1:]
         if len(rows) == 0:
             break
         for row in rows:
-            yield row.find_all("td")
+            yield page_id, row.find_all("td")
 
 
 def scrape_submissions(from_page=1, to_page=SCRAPER_LIMIT, **query_dict):
@@ -33,7 +33,7 @@ def scrape_submissions(from_page=1, to_page=SCRAPER_LIMIT, **query_dict):
     page_url = "https://oj.uz/submissions"
     rows = __scrape_paginated_table_rows(page_url, from_page, to_page,
                                          table_css_selector=".container .table", **query_dict)
-    for row in rows:
+    for page_id, row in rows:
         if len(row) != 8:
             raise Exception("Unexpected number of columns.")
         # Parse required information.
@@ -47,6 +47,7 @@ def scrape_submissions(from_page=1, to_page=SCRAPER_LIMIT, **query_dict):
                 task_id=row[3].find("a", href=True)['href'].split('/')[-1].lower(),
                 verdict=parsers.parse_verdict(verdict_text),
                 score=parsers.parse_score(verdict_text),
+                page_id=page_id,
             )
             if submission['verdict'] != 'CE':
                 submission.update(dict(
@@ -66,7 +67,7 @@ def scrape_task_info(task_id):
     :return: task information, in dict format
     """
     page_url = "https://oj.uz/problem/view/" + task_id
-    page = get_page(page_url)
+    page = get_page(page_url, use_cache=True)
     soup = BeautifulSoup(page.content, 'html.parser')
 
     title_div = soup.select_one('.problem-title')
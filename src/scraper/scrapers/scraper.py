@@ -1,12 +1,19 @@
 from collections import Generator
-from typing import Dict
+from typing import Dict, List
+
+from core.logging import log
 
 
 class Scraper:
     def scrape_submissions_for_user(self, user_id: str) -> Generator:
         raise NotImplementedError()
 
-    def scrape_submissions_for_task(self, task_id: str) -> Generator:
+    def scrape_submissions_for_task(self, task_id: str, from_page: int = 1) -> Generator:
+        """
+        Scrapes the submissions of a task, newest first.
+        Paginated scrapers start at `from_page` and tag each submission
+        with the page it was found on (under 'page_id').
+        """
         raise NotImplementedError()
 
     def scrape_recent_submissions(self) -> Generator:
@@ -18,5 +25,49 @@ class Scraper:
     def scrape_user_info(self, handle: str) -> Dict:
         raise NotImplementedError()
 
+    def scrape_task_infos(self, task_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Scrapes the info of many tasks at once. Judges that can get many tasks
+        per request should override this; by default, tasks are scraped one
+        by one. Tasks that are not found or fail to be scraped are skipped.
+        :return: a dict from task ids to task infos
+        """
+        task_infos = {}
+        for task_id in task_ids:
+            try:
+                task_info = self.scrape_task_info(task_id)
+            except NotImplementedError:
+                raise
+            except Exception as ex:
+                log.exception(ex)
+                continue
+            if task_info is None:
+                log.warning(f"Did not find task info for '{task_id}'. Skipping...")
+                continue
+            log.info(f"Successfully scraped '{task_id}' [{task_info['title']}]...")
+            task_infos[task_id] = task_info
+        return task_infos
+
+    def scrape_user_infos(self, handles: List[str]) -> List[Dict]:
+        """
+        Scrapes the info of many handles at once. Judges with bulk endpoints
+        should override this; by default, handles are scraped one by one.
+        Handles that fail to be scraped are skipped.
+        """
+        user_infos = []
+        for handle in handles:
+            try:
+                user_info = self.scrape_user_info(handle)
+            except NotImplementedError:
+                raise
+            except Exception as ex:
+                log.exception(ex)
+                continue
+            log.info(f"Successfully scraped user info for '{handle}'")
+            log.debug(user_info)
+            if user_info:
+                user_infos.append(user_info)
+        return user_infos
+
     def scrape_task_statement(self, task_id: str) -> Dict:
         raise NotImplementedError()
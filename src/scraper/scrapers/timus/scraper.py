@@ -8,7 +8,8 @@ class TimusScraper(Scraper):
     def scrape_submissions_for_user(self, user_id):
         return utils.scrape_submissions(author=user_id)
 
-    def scrape_submissions_for_task(self, task_id):
+    def scrape_submissions_for_task(self, task_id, from_page=1):
+        # Not paginated: all the submissions come in one page.
         return utils.scrape_submissions(num=task_id)
 
     def scrape_recent_submissions(self):
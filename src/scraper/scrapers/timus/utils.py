@@ -1,3 +1,4 @@
+from scraper import parsing
 from scraper.utils import get_page
 from bs4 import BeautifulSoup
 from .parsers import parse_time_exec, parse_memory_used, parse_verdict, parse_date, parse_time_limit, parse_memory_limit
@@ -13,8 +14,7 @@ def scrape_submissions(**query_args):
         count=query_args.pop('count', 1000),
         **query_args,
     )
-    soup = BeautifulSoup(response.text, 'html.parser')
-    table = soup.select_one("table.status")
+    table = parsing.select_one(response.content, "table.status")
 
     for row in table.select("tr.odd, tr.even"):
         row = row.select('td')
@@ -38,7 +38,7 @@ def scrape_submissions(**query_args):
 def scrape_task_info(task_id, space=1):
     url = "https://acm.timus.ru/problem.aspx"
     response = get_page(
-        url, num=task_id, space=space)
+        url, use_cache=True, num=task_id, space=space)
     soup = BeautifulSoup(response.text, 'html.parser')
 
     title = soup.select_one("h2.problem_title").text.split('.', 1)[1].strip()
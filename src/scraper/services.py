@@ -1,12 +1,30 @@
+import hashlib
 import heapq
 import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import closing
 from datetime import datetime, timedelta
 
 from celery import shared_task
+from django.db import connection
+from django.utils import timezone
 
 from core.logging import log
 from data.models import Task, UserHandle
-from scraper import scrapers, queries
+from scraper import scrapers, queries, sessions, concurrency, resolution
+
+
+# Checkpoints of interrupted runs older than this are not resumed.
+CHECKPOINT_MAX_AGE = timedelta(days=1)
+
+# How long to wait for judges past their deadline to write what they scraped.
+RECENT_SUBMISSIONS_GRACE = 5
+
+# Judges whose recent submissions are being scraped by this process.
+__recent_locks = {}
+__recent_locks_lock = threading.Lock()
 
 
 def __expand_task(judge_id, task_id):
@@ -25,24 +43,163 @@ def __expand_handle(judge_id, handle):
     return handles
 
 
+def __get_run_key(*args):
+    """
+    Identifies a scrape run by its arguments, so that a restarted run can
+    find the checkpoint of the interrupted one.
+    """
+    run_key = '/'.join(map(str, args))
+    if len(run_key) > 256:
+        run_key = hashlib.sha1(run_key.encode()).hexdigest()
+    return run_key
+
+
+def __get_stop_date(judge_id, to_date, watermark):
+    """
+    Submissions older than the returned date are not scraped.
+    :param to_date: the oldest date the caller asked for
+    :param watermark: the date of the newest submission scraped before, if any
+    """
+    if watermark is None:
+        return to_date
+    overlap = timedelta(seconds=sessions.get_option(judge_id, 'WATERMARK_OVERLAP'))
+    return max(to_date, watermark - overlap)
+
+
+def __take_newer(submissions, stop_date, on_stop):
+    # Like itertools.takewhile(), but tells whether the date cut the
+    # submissions short. Judges yield the newest submissions first, so the
+    # scrapers do not request any more pages afterwards.
+    for submission in submissions:
+        if submission['submitted_on'] < stop_date:
+            on_stop()
+            return
+        yield submission
+
+
+def __get_new_watermark(newest, stopped, to_date, watermark):
+    """
+    Gets the submission to be stored as the new high-water mark after a
+    successful scrape, or None if the mark should stay as it is. The mark may
+    only move if no submissions were left out between it and the newest one
+    (i.e. the scrape went all the way back, or at least back to the old mark).
+    """
+    if newest is None:
+        return None
+    if watermark is not None and newest['submitted_on'] <= watermark:
+        return None
+    if stopped and (watermark is None or to_date > watermark):
+        return None
+    return newest
+
+
+def __write_chunks(chunks, newest=None, bulk=False, on_chunk=None):
+    """
+    Writes the chunks of submissions scraped for a task/handle.
+    :param newest: the newest submission written before (e.g. by a resumed run)
+    :param bulk: whether to load all the chunks at once through COPY (see
+    queries.copy_submissions()), instead of upserting them one by one
+    :param on_chunk: called with each chunk and the newest submission so far,
+    once the chunk is written (not in bulk mode, as nothing is visible
+    before everything is loaded)
+    :return: the newest submission written, if any
+    """
+    def take_newest(chunk):
+        nonlocal newest
+        newest = max(filter(None, [newest, *chunk]), key=lambda x: x['submitted_on'])
+
+    if bulk:
+        def flatten():
+            for chunk in chunks:
+                take_newest(chunk)
+                yield from chunk
+
+        queries.copy_submissions(flatten())
+        return newest
+
+    for chunk in chunks:
+        queries.write_submissions(chunk)
+        take_newest(chunk)
+        if on_chunk:
+            on_chunk(chunk, newest)
+    return newest
+
+
+def __get_recent_lock(judge_id):
+    with __recent_locks_lock:
+        return __recent_locks.setdefault(judge_id, threading.Lock())
+
+
+def __take_until(submissions, judge_id, deadline):
+    for submission in submissions:
+        if time.monotonic() > deadline:
+            log.warning(f"Scraping recent submissions for {judge_id} timed out. "
+                        f"Stopping...")
+            return
+        yield submission
+
+
+def __scrape_recent_submissions(judge_id, to_date, deadline):
+    # A poll still stuck on a judge (e.g. backing off during an outage)
+    # is not joined by the next ones.
+    lock = __get_recent_lock(judge_id)
+    if not lock.acquire(blocking=False):
+        log.warning(f"Still scraping recent submissions for {judge_id}. Skipping...")
+        return
+    try:
+        scraper = scrapers.create_scraper(judge_id)
+        submissions = scraper.scrape_recent_submissions()
+        submissions = itertools.takewhile(
+            lambda x: x['submitted_on'] >= to_date, submissions)
+        queries.write_submissions(__take_until(submissions, judge_id, deadline))
+    except Exception as ex:
+        log.error(
+            f"Exception while fetching recent submissions for {judge_id}")
+        log.exception(ex)
+    finally:
+        lock.release()
+        # Each thread has a database connection of its own.
+        connection.close()
+
+
 @shared_task
 def scrape_recent_submissions(*judge_ids, to_days=1):
+    """
+    Scrapes the recent submissions of some judges, concurrently (a thread
+    per judge). Each judge stops after RECENT_SUBMISSIONS_TIMEOUT seconds
+    (option of settings.SCRAPER_HTTP), keeping what it scraped so far, so
+    that a slow judge never delays the others, nor the next poll.
+    """
     to_date = datetime.now() - timedelta(days=to_days)
+    executor = ThreadPoolExecutor(max_workers=max(1, len(judge_ids)))
+    futures = {}
+    deadline = time.monotonic()
     for judge_id in judge_ids:
-        try:
-            scraper = scrapers.create_scraper(judge_id)
-            submissions = scraper.scrape_recent_submissions()
-            submissions = itertools.takewhile(
-                lambda x: x['submitted_on'] >= to_date, submissions)
-            queries.write_submissions(submissions)
-        except Exception as ex:
-            log.error(
-                f"Exception while fetching recent submissions for {judge_id}")
-            log.exception(ex)
+        judge_deadline = time.monotonic() + \
+            sessions.get_option(judge_id, 'RECENT_SUBMISSIONS_TIMEOUT')
+        deadline = max(deadline, judge_deadline)
+        future = executor.submit(__scrape_recent_submissions, judge_id, to_date, judge_deadline)
+        futures[future] = judge_id
+
+    # Judges stuck inside a request (past their deadline) are left behind.
+    _, not_done = wait(futures, timeout=max(0., deadline - time.monotonic()) +
+                       RECENT_SUBMISSIONS_GRACE)
+    for future in not_done:
+        log.warning(f"Scraping recent submissions for {futures[future]} is taking too long. "
+                    f"Not waiting for it...")
+    executor.shutdown(wait=False)
 
 
 @shared_task
-def scrape_submissions_for_tasks(*tasks, from_days=0, to_days=100000):
+def scrape_submissions_for_tasks(*tasks, from_days=0, to_days=100000, full=False,
+                                 bulk=False):
+    """
+    Scrapes the submissions of some tasks, newest first.
+    Unless `full` is set, the scrape stops at the high-water mark of each
+    task (the newest submission scraped before).
+    With `bulk` set, the submissions of each task are loaded through COPY,
+    which is much faster for backfills (but only checkpointed per task).
+    """
     log.info(f"Scraping submissions for tasks {tasks}...")
 
     from_date = datetime.now() - timedelta(days=from_days)
@@ -51,33 +208,91 @@ def scrape_submissions_for_tasks(*tasks, from_days=0, to_days=100000):
     log.info(f'Dates between {to_date} and {from_date}...')
 
     task_dict = {}
+    spec_dict = {}
     for task in tasks:
         judge_id, task_id = task.split('/', 1)
         task_ids = __expand_task(judge_id, task_id)
         task_dict[judge_id] = task_dict.get(judge_id, []) + task_ids
+        spec_dict[judge_id] = spec_dict.get(judge_id, []) + [task_id]
 
     for judge_id, task_ids in task_dict.items():
-        task_ids = list(set(task_ids))
+        # Sorted, so that a restarted run goes through the tasks in the same order.
+        task_ids = sorted(set(task_ids))
         log.info(f"Scraping task submissions from judge '{judge_id}':")
         log.info(f'Task ids: {task_ids}')
 
+        run_key = __get_run_key(
+            'tasks', judge_id, to_days, full, ','.join(sorted(set(spec_dict[judge_id]))))
+        from_pages = {}
+        resumed_newest = {}
+        checkpoint = queries.get_checkpoint(run_key, CHECKPOINT_MAX_AGE)
+        if checkpoint:
+            log.info(f"Resuming from task '{checkpoint.task_id}' "
+                     f"(page: {checkpoint.page_id})...")
+            task_ids = [task_id for task_id in task_ids if task_id >= checkpoint.task_id]
+            if checkpoint.page_id:
+                from_pages[checkpoint.task_id] = checkpoint.page_id
+            if checkpoint.newest_submitted_on:
+                resumed_newest[checkpoint.task_id] = {
+                    'submission_id': checkpoint.newest_submission_id,
+                    'submitted_on': timezone.make_naive(checkpoint.newest_submitted_on),
+                }
+
         scraper = scrapers.create_scraper(judge_id)
-        for task_id in task_ids:
-            try:
-                submissions = scraper.scrape_submissions_for_task(task_id)
-                submissions = itertools.takewhile(
-                    lambda x: x['submitted_on'] >= to_date, submissions)
-                queries.write_submissions(submissions)
-            except NotImplementedError:
-                log.warning(
-                    f'Scraping submissions not implemented for {scraper.__class__.__name__}.')
-                break
-            except Exception as ex:
-                log.exception(ex)
+        watermarks = queries.get_task_watermarks(judge_id, task_ids)
+        # The tasks may have just been added (e.g. by another process, which
+        # then scheduled this run), while cached as missing in this one.
+        resolution.tasks.forget(judge_id, task_ids)
+        stopped = set()
+
+        def scrape_task(task_id):
+            submissions = scraper.scrape_submissions_for_task(
+                task_id, from_page=from_pages.get(task_id, 1))
+            stop_date = __get_stop_date(
+                judge_id, to_date, None if full else watermarks.get(task_id))
+            return __take_newer(submissions, stop_date, lambda: stopped.add(task_id))
+
+        # Tasks are scraped concurrently, but written in order.
+        results = concurrency.imap_chunked(
+            scrape_task, task_ids,
+            max_workers=sessions.get_option(judge_id, 'WORKERS'))
+        with closing(results):
+            for task_id, chunks in results:
+                newest = resumed_newest.get(task_id)
+                queries.write_checkpoint(
+                    run_key, judge_id, task_id, from_pages.get(task_id), newest)
+                try:
+                    newest = __write_chunks(
+                        chunks, newest, bulk=bulk,
+                        on_chunk=lambda chunk, newest: queries.write_checkpoint(
+                            run_key, judge_id, task_id, chunk[-1].get('page_id'), newest))
+                except NotImplementedError:
+                    log.warning(
+                        f'Scraping submissions not implemented for {scraper.__class__.__name__}.')
+                    break
+                except Exception as ex:
+                    log.exception(ex)
+                    continue
+
+                newest = __get_new_watermark(
+                    newest, task_id in stopped, to_date, watermarks.get(task_id))
+                if newest:
+                    queries.write_task_watermark(judge_id, task_id, newest)
+
+        # The run got through all the tasks, so there is nothing to resume.
+        queries.delete_checkpoint(run_key)
 
 
 @shared_task
-def scrape_submissions_for_users(*user_ids, from_days=0, to_days=100000):
+def scrape_submissions_for_users(*user_ids, from_days=0, to_days=100000, full=False,
+                                 bulk=False):
+    """
+    Scrapes the submissions of some handles, newest first.
+    Unless `full` is set, the scrape stops at the high-water mark of each
+    handle (the newest submission scraped before).
+    With `bulk` set, the submissions of each handle are loaded through COPY,
+    which is much faster for backfills (e.g. of new handles).
+    """
     log.info(f"Scraping submissions for users {user_ids}...")
 
     from_date = datetime.now() - timedelta(days=from_days)
@@ -97,21 +312,36 @@ def scrape_submissions_for_users(*user_ids, from_days=0, to_days=100000):
         log.info(f'Handles: {handles}')
 
         scraper = scrapers.create_scraper(judge_id)
-
-        # Get submissions as list of generators.
-        for handle in handles:
-            try:
-                submissions = scraper.scrape_submissions_for_user(handle)
-                submissions = itertools.takewhile(
-                    lambda x: x['submitted_on'] >= to_date, submissions)
-                queries.write_submissions(submissions)
-
-            except NotImplementedError:
-                log.warning(
-                    f'Scraping submissions not implemented for {scraper.__class__.__name__}.')
-                return
-            except Exception as ex:
-                log.exception(ex)
+        watermarks = queries.get_handle_watermarks(judge_id, handles)
+        resolution.handles.forget(judge_id, [handle.lower() for handle in handles])
+        stopped = set()
+
+        def scrape_user(handle):
+            submissions = scraper.scrape_submissions_for_user(handle)
+            stop_date = __get_stop_date(
+                judge_id, to_date, None if full else watermarks.get(handle.lower()))
+            return __take_newer(submissions, stop_date, lambda: stopped.add(handle))
+
+        # Handles are scraped concurrently, but written in order.
+        results = concurrency.imap_chunked(
+            scrape_user, handles,
+            max_workers=sessions.get_option(judge_id, 'WORKERS'))
+        with closing(results):
+            for handle, chunks in results:
+                try:
+                    newest = __write_chunks(chunks, bulk=bulk)
+                except NotImplementedError:
+                    log.warning(
+                        f'Scraping submissions not implemented for {scraper.__class__.__name__}.')
+                    return
+                except Exception as ex:
+                    log.exception(ex)
+                    continue
+
+                newest = __get_new_watermark(
+                    newest, handle in stopped, to_date, watermarks.get(handle.lower()))
+                if newest:
+                    queries.write_handle_watermark(judge_id, handle, newest)
 
 
 @shared_task
@@ -121,37 +351,28 @@ def scrape_task_info(task):
     task_ids = __expand_task(judge_id, task_id)
 
     scraper = scrapers.create_scraper(judge_id)
-    task_infos = []
     log.info(f"Task ids: {task_ids}")
+    try:
+        # Judges with bulk endpoints scrape many tasks per request.
+        scraped_task_infos = scraper.scrape_task_infos(task_ids)
+    except NotImplementedError:
+        log.warning(
+            f'Scraping tasks not implemented for {scraper.__class__.__name__}.')
+        return
 
-    for task_id in task_ids:
+    task_infos = []
+    for task_id, task_info in scraped_task_infos.items():
+        log.debug(task_info)
         try:
-            task_info = scraper.scrape_task_info(task_id)
-            if task_info is None:
-                log.warning(
-                    f"Did not find task info for '{task_id}'. Skipping...")
-                continue
-
-            log.debug(task_info)
-            log.info(
-                f"Successfully scraped '{task_id}' [{task_info['title']}]...")
-
-            try:
-                statement_info = scraper.scrape_task_statement(task_id)
-                task_info.update(statement_info)
-            except NotImplementedError:
-                log.warning(
-                    f"Could not get statement of task {task_id}: not implemented.")
-            except Exception as ex:
-                log.warning(f"Could not get statement of task {task_id}: {ex}")
-
-            task_infos.append(task_info)
+            statement_info = scraper.scrape_task_statement(task_id)
+            task_info.update(statement_info)
         except NotImplementedError:
             log.warning(
-                f'Scraping tasks not implemented for {scraper.__class__.__name__}.')
-            return
+                f"Could not get statement of task {task_id}: not implemented.")
         except Exception as ex:
-            log.exception(ex)
+            log.warning(f"Could not get statement of task {task_id}: {ex}")
+
+        task_infos.append(task_info)
 
     queries.write_tasks(task_infos)
 
@@ -164,39 +385,35 @@ def scrape_handle_info(handle):
     log.info(f"Handles: {handles}")
 
     scraper = scrapers.create_scraper(judge_id)
-
-    user_infos = []
-    for handle in handles:
-        try:
-            user_info = scraper.scrape_user_info(handle)
-            log.info(f"Successfully scraped user info for '{handle}'")
-            log.debug(user_info)
-            if user_info:
-                user_infos.append(user_info)
-        except NotImplementedError:
-            log.warning(
-                f'Scraping handles not implemented for {scraper.__class__.__name__}.')
-            return
-        except Exception as ex:
-            log.exception(ex)
+    try:
+        # Judges with bulk endpoints scrape many handles per request.
+        user_infos = scraper.scrape_user_infos(handles)
+    except NotImplementedError:
+        log.warning(
+            f'Scraping handles not implemented for {scraper.__class__.__name__}.')
+        return
+    log.info(f"Scraped info for {len(user_infos)} out of {len(handles)} handles.")
 
     queries.write_handles(user_infos)
 
 
 @shared_task
 def scrape_tasks_info():
-    for task in Task.objects.all():
+    judge_ids = (Task.objects.order_by()
+                 .values_list('judge__judge_id', flat=True).distinct())
+    for judge_id in judge_ids:
         try:
-            scrape_task_info(task.get_path())
+            scrape_task_info(f"{judge_id}/*")
         except Exception as e:
-            log.exception(f"Could not parse task '{task}': {e}")
+            log.exception(f"Could not parse tasks for judge '{judge_id}': {e}")
 
 
 @shared_task
 def scrape_handles_info():
-    for handle in UserHandle.objects.all():
+    judge_ids = (UserHandle.objects.order_by()
+                 .values_list('judge__judge_id', flat=True).distinct())
+    for judge_id in judge_ids:
         try:
-            scrape_handle_info(
-                '/'.join([handle.judge.judge_id, handle.handle]))
+            scrape_handle_info(f"{judge_id}/*")
         except Exception as e:
-            log.exception(f"Could not parse handle '{handle}': {e}")
+            log.exception(f"Could not parse handles for judge '{judge_id}': {e}")
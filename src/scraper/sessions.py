@@ -0,0 +1,115 @@
+import threading
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from scraper import ratelimit, replay
+
+DEFAULT_JUDGE_ID = 'default'
+
+# Maps judge hosts to judge ids. Subdomains (e.g. 'www.infoarena.ro' or
+# 'agc003.contest.atcoder.jp') resolve to the judge of their parent domain.
+JUDGE_HOSTS = {
+    'infoarena.ro': 'ia',
+    'codeforces.com': 'cf',
+    'csacademy.com': 'csa',
+    'atcoder.jp': 'ac',
+    'oj.uz': 'ojuz',
+    'acm.timus.ru': 'timus',
+}
+
+# Fallback values for options missing from settings.SCRAPER_HTTP.
+DEFAULT_OPTIONS = {
+    'POOL_SIZE': 10,
+    'CONNECT_TIMEOUT': 10,
+    'READ_TIMEOUT': 60,
+    'WORKERS': 4,
+    'RATE': 5,
+    'BURST': 10,
+    'BACKOFF_BASE': 1,
+    'BACKOFF_CAP': 60,
+    'CACHE_TTL': 24 * 60 * 60,
+    'WATERMARK_OVERLAP': 60 * 60,
+    'SCRAPER_TTL': 60 * 60,
+    'RESOLUTION_TTL': 10 * 60,
+    'RECENT_SUBMISSIONS_TIMEOUT': 25,
+}
+
+__sessions = {}
+__lock = threading.Lock()
+
+
+def get_option(judge_id: str, name: str):
+    """
+    Gets a scraper option for a judge.
+    Judge-specific values in settings.SCRAPER_HTTP take precedence over
+    the 'default' ones, which take precedence over DEFAULT_OPTIONS.
+    :param judge_id: the id of the judge (e.g. 'cf')
+    :param name: the name of the option (e.g. 'POOL_SIZE')
+    """
+    options = getattr(settings, 'SCRAPER_HTTP', {})
+    for key in [judge_id, DEFAULT_JUDGE_ID]:
+        if name in options.get(key, {}):
+            return options[key][name]
+    return DEFAULT_OPTIONS[name]
+
+
+def get_judge_id(page_url: str) -> str:
+    """
+    Finds out which judge a url belongs to.
+    :param page_url: the url (e.g. 'https://www.infoarena.ro/monitor')
+    :return: the judge id, or DEFAULT_JUDGE_ID for unknown hosts
+    """
+    host = urlparse(page_url).hostname or ''
+    for judge_host, judge_id in JUDGE_HOSTS.items():
+        if host == judge_host or host.endswith('.' + judge_host):
+            return judge_id
+    return DEFAULT_JUDGE_ID
+
+
+def get_timeout(judge_id: str):
+    return (get_option(judge_id, 'CONNECT_TIMEOUT'),
+            get_option(judge_id, 'READ_TIMEOUT'))
+
+
+def get_session(judge_id: str) -> requests.Session:
+    """
+    Gets the session shared by all requests to a judge.
+    Sessions keep connections alive and pool them (up to POOL_SIZE
+    connections per host), so consecutive pages reuse the same TCP/TLS
+    connection instead of doing a new handshake.
+    """
+    with __lock:
+        session = __sessions.get(judge_id)
+        if session is None:
+            pool_size = get_option(judge_id, 'POOL_SIZE')
+            adapter = HTTPAdapter(pool_connections=pool_size,
+                                  pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            __sessions[judge_id] = session
+        return session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Sends a request through the session of the judge owning the url,
+    once the rate limiter of the judge allows it.
+    While fixtures are in use (see replay.use_fixtures()), requests go
+    through the fixture session instead; replayed ones are not rate limited.
+    Accepts the same keyword arguments as requests.request().
+    """
+    judge_id = get_judge_id(url)
+    kwargs.setdefault('timeout', get_timeout(judge_id))
+    adapter = replay.get_adapter()
+    if adapter is None or adapter.mode == replay.RECORD:
+        ratelimit.acquire(judge_id)
+    session = get_session(judge_id) if adapter is None else adapter.session
+    return session.request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
@@ -1,7 +1,27 @@
-from django.test import TestCase
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 # Create your tests here.
+import itertools
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import requests
+from bs4 import BeautifulSoup
+from django.contrib.auth.models import User
+
+from data.models import Judge, Task, UserHandle, Submission, MethodTag, TaskSource, TaskStatement
+from schedule.models import TaskScheduleInfo, ScrapeCheckpoint, AvatarInfo
+from scraper import sessions, concurrency, ratelimit, cache, services, scrapers, parsing, \
+    replay, queries, resolution
+from scraper.scrapers.codeforces.scraper import CodeforcesScraper
 from scraper.scrapers.csacademy.scraper import CSAcademyScraper
+from scraper.scrapers.infoarena import utils as infoarena_utils
 from scraper.scrapers.infoarena.scraper import InfoarenaScraper
 from scraper.services import scrape_submissions_for_users
 
@@ -22,4 +42,627 @@ class IATC(TestCase):
     def test_tz(self):
         for submission in InfoarenaScraper().scrape_recent_submissions():
             print(submission['submitted_on'])
-            break
\ No newline at end of file
+            break
+
+
+class SessionsTestCase(TestCase):
+    def test_judge_id_from_url(self):
+        self.assertEqual(sessions.get_judge_id('https://www.infoarena.ro/monitor'), 'ia')
+        self.assertEqual(sessions.get_judge_id('https://agc003.contest.atcoder.jp/'), 'ac')
+        self.assertEqual(sessions.get_judge_id('https://codeforces.com/api/user.info'), 'cf')
+        self.assertEqual(sessions.get_judge_id('https://example.com/'), sessions.DEFAULT_JUDGE_ID)
+
+    def test_session_is_shared(self):
+        self.assertIs(sessions.get_session('ia'), sessions.get_session('ia'))
+        self.assertIsNot(sessions.get_session('ia'), sessions.get_session('cf'))
+
+
+class ImapChunkedTestCase(TestCase):
+    @staticmethod
+    def generate(item):
+        # Later items finish first, to check that the order is preserved.
+        time.sleep(0.01 * (5 - item))
+        for i in range(item):
+            yield (item, i)
+
+    def test_order_is_preserved(self):
+        results = [(item, [elem for chunk in chunks for elem in chunk])
+                   for item, chunks in concurrency.imap_chunked(
+                       self.generate, range(5), max_workers=3, chunk_size=2)]
+        self.assertEqual(results, [(item, [(item, i) for i in range(item)])
+                                   for item in range(5)])
+
+    def test_exceptions_are_reraised(self):
+        def generate(item):
+            yield item
+            if item == 1:
+                raise ValueError(item)
+
+        seen = []
+        for item, chunks in concurrency.imap_chunked(generate, range(3), max_workers=2):
+            try:
+                for chunk in chunks:
+                    seen.extend(chunk)
+            except ValueError:
+                seen.append('error')
+        self.assertEqual(seen, [0, 1, 'error', 2])
+
+
+class TokenBucketTestCase(TestCase):
+    def test_burst_then_rate(self):
+        buckets = ratelimit.LocalBuckets()
+        for _ in range(3):
+            self.assertEqual(buckets.reserve('ia', 2, 3, now=100), (0, True))
+        # The bucket is empty, so the next tokens are handed out every 0.5s.
+        self.assertEqual(buckets.reserve('ia', 2, 3, now=100), (0.5, True))
+        self.assertEqual(buckets.reserve('ia', 2, 3, now=100), (1, True))
+        self.assertEqual(buckets.reserve('cf', 2, 3, now=100), (0, True))
+
+    def test_block(self):
+        buckets = ratelimit.LocalBuckets()
+        buckets.block('ia', 110, now=100)
+        buckets.block('ia', 105, now=100)
+        self.assertEqual(buckets.reserve('ia', 2, 3, now=100), (10, False))
+        self.assertEqual(buckets.reserve('ia', 2, 3, now=110), (0, True))
+
+    def test_backoff_delay(self):
+        self.assertEqual(ratelimit.get_backoff_delay('ia', 0, retry_after='7'), 7)
+        for tries in range(10):
+            delay = ratelimit.get_backoff_delay('ia', tries)
+            cap = min(sessions.get_option('ia', 'BACKOFF_CAP'),
+                      sessions.get_option('ia', 'BACKOFF_BASE') * 2 ** tries)
+            self.assertTrue(cap / 2 <= delay <= cap)
+
+
+class PageCacheTestCase(TestCase):
+    URL = 'https://www.infoarena.ro/problema/adunare'
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(SCRAPER_CACHE_DIR=self.cache_dir.name)
+        self.settings_override.enable()
+        self.requests = []
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.cache_dir.cleanup()
+
+    def fetch(self, headers):
+        self.requests.append(headers)
+        response = requests.Response()
+        if headers.get('If-None-Match') == '"v1"':
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response._content = b'<h1>Adunare</h1>'
+            response.headers['ETag'] = '"v1"'
+        return response
+
+    def test_fresh_pages_are_not_requested(self):
+        for _ in range(3):
+            page = cache.get_cached_page(self.URL, self.fetch)
+            self.assertEqual(page.content, b'<h1>Adunare</h1>')
+        self.assertEqual(self.requests, [{}])
+
+    @override_settings(SCRAPER_HTTP={'default': {'CACHE_TTL': 0}})
+    def test_stale_pages_are_revalidated(self):
+        cache.get_cached_page(self.URL, self.fetch)
+        page = cache.get_cached_page(self.URL, self.fetch)
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.content, b'<h1>Adunare</h1>')
+        self.assertEqual(self.requests, [{}, {'If-None-Match': '"v1"'}])
+
+
+class WatermarkTestCase(TestCase):
+    def setUp(self):
+        judge = Judge.objects.create(judge_id='ia')
+        self.task = Task.objects.create(judge=judge, task_id='adunare')
+        user = User.objects.create_user(username='testuser', password='12345').profile
+        UserHandle.objects.create(judge=judge, handle='ia_user', user=user)
+        self.submissions = []
+        self.scraped = []
+        for _ in range(10):
+            self.add_submission()
+
+    def add_submission(self):
+        days_ago = 20.5 - len(self.submissions)
+        # Judges yield the newest submissions first.
+        self.submissions.insert(0, dict(
+            judge_id='ia', submission_id=str(len(self.submissions)),
+            author_id='ia_user', task_id='adunare', verdict='AC',
+            submitted_on=datetime.now() - timedelta(days=days_ago)))
+
+    def scrape_submissions_for_task(self, task_id, from_page=1):
+        for submission in self.submissions:
+            self.scraped.append(submission['submission_id'])
+            yield submission
+
+    def scrape(self, **kwargs):
+        self.scraped = []
+        scraper = mock.Mock(scrape_submissions_for_task=self.scrape_submissions_for_task)
+        with mock.patch('scraper.scrapers.create_scraper', return_value=scraper):
+            services.scrape_submissions_for_tasks('ia/adunare', **kwargs)
+
+    def test_scrape_stops_at_watermark(self):
+        self.scrape()
+        self.assertEqual(len(self.scraped), 10)
+        self.assertEqual(TaskScheduleInfo.objects.get(task=self.task).last_submission_id, '9')
+
+        self.add_submission()
+        self.scrape()
+        # The new submission, the watermark and the first one older than it.
+        self.assertEqual(self.scraped, ['10', '9', '8'])
+        self.assertEqual(Submission.objects.count(), 11)
+        self.assertEqual(TaskScheduleInfo.objects.get(task=self.task).last_submission_id, '10')
+
+        self.scrape(full=True)
+        self.assertEqual(len(self.scraped), 11)
+
+    def test_partial_scrape_keeps_watermark(self):
+        # Older submissions were never scraped, so there is no watermark yet.
+        self.scrape(to_days=15)
+        self.assertEqual(len(self.scraped), 5)
+        self.assertFalse(TaskScheduleInfo.objects.filter(task=self.task).exists())
+
+
+class CheckpointTestCase(TestCase):
+    def setUp(self):
+        judge = Judge.objects.create(judge_id='ia')
+        for task_id in ['a', 'b', 'c']:
+            Task.objects.create(judge=judge, task_id=task_id)
+        self.calls = []
+
+    def scrape_submissions_for_task(self, task_id, from_page=1):
+        self.calls.append((task_id, from_page))
+        return iter([])
+
+    def scrape(self):
+        scraper = mock.Mock(scrape_submissions_for_task=self.scrape_submissions_for_task)
+        with mock.patch('scraper.scrapers.create_scraper', return_value=scraper):
+            services.scrape_submissions_for_tasks('ia/*')
+
+    def test_resume_from_checkpoint(self):
+        ScrapeCheckpoint.objects.create(
+            run_key='tasks/ia/100000/False/*', judge_id='ia', task_id='b', page_id=3)
+        self.scrape()
+        self.assertCountEqual(self.calls, [('b', 3), ('c', 1)])
+        # The run completed, so the next one starts over.
+        self.assertFalse(ScrapeCheckpoint.objects.exists())
+        self.calls = []
+        self.scrape()
+        self.assertCountEqual(self.calls, [('a', 1), ('b', 1), ('c', 1)])
+
+
+class CodeforcesUserInfoTestCase(TestCase):
+    @staticmethod
+    def api_call(api_method, kwargs):
+        handles = kwargs['handles'].split(';')
+        if 'ghost' in handles:
+            return {'status': 'FAILED', 'comment': 'handles: User with handle ghost not found'}
+        return {'status': 'OK', 'result': [{'handle': handle} for handle in handles]}
+
+    def test_handles_are_batched(self):
+        handles = [f'user{i}' for i in range(999)] + ['ghost']
+        with mock.patch('scraper.scrapers.codeforces.utils._api_call',
+                        side_effect=self.api_call) as api_call:
+            user_infos = CodeforcesScraper().scrape_user_infos(handles)
+        self.assertEqual([info['handle'] for info in user_infos], handles[:-1])
+        # Two batches of 500 handles, plus a retry of the second one without 'ghost'.
+        self.assertEqual(api_call.call_count, 3)
+
+
+class CodeforcesTaskInfoTestCase(TestCase):
+    @staticmethod
+    def api_get(api_method, kwargs):
+        def problem(contest_id, index):
+            return {'contestId': contest_id, 'index': index, 'name': index, 'tags': []}
+
+        if api_method == 'problemset.problems':
+            return {'problems': [problem(1, 'A'), problem(1, 'B'), problem(2, 'A')]}
+        if api_method == 'contest.list':
+            return [{'id': 1, 'name': 'Round 1'}, {'id': 2, 'name': 'Round 2'}]
+        if api_method == 'contest.standings':
+            return {'contest': {'id': kwargs['contestId'], 'name': 'Gym'},
+                    'problems': [problem(100001, 'A'), problem(100001, 'B')]}
+
+    def test_tasks_are_scraped_in_bulk(self):
+        task_ids = ['1/A', '1/B', '2/A', '100001/A', '100001/B']
+        with mock.patch('scraper.scrapers.codeforces.utils._api_get',
+                        side_effect=self.api_get) as api_get:
+            task_infos = CodeforcesScraper().scrape_task_infos(task_ids)
+        self.assertEqual(list(task_infos), task_ids)
+        self.assertEqual(task_infos['2/A']['source'], 'Round 2')
+        self.assertEqual(task_infos['100001/B']['source'], 'Gym')
+        # The problemset, the contest list and the standings of the gym contest.
+        self.assertEqual(api_get.call_count, 3)
+
+
+class ScraperRegistryTestCase(TestCase):
+    def test_scrapers_are_reused(self):
+        self.assertIs(scrapers.create_scraper('ojuz'), scrapers.create_scraper('ojuz'))
+
+    @override_settings(SCRAPER_HTTP={'default': {'SCRAPER_TTL': 0}})
+    def test_scrapers_expire(self):
+        self.assertIsNot(scrapers.create_scraper('ojuz'), scrapers.create_scraper('ojuz'))
+
+    @override_settings(SCRAPER_HTTP={'default': {'SCRAPER_TTL': 0}})
+    def test_slow_bootstrap_blocks_its_judge_only(self):
+        bootstrapping, bootstrapped = threading.Event(), threading.Event()
+
+        def bootstrap(scraper):
+            bootstrapping.set()
+            bootstrapped.wait(5)
+
+        with mock.patch.object(InfoarenaScraper, '__init__', bootstrap):
+            thread = threading.Thread(target=scrapers.create_scraper, args=('ia',))
+            thread.start()
+            bootstrapping.wait(5)
+            start = time.time()
+            scrapers.create_scraper('ojuz')
+            self.assertLess(time.time() - start, 1)
+            bootstrapped.set()
+            thread.join()
+
+
+class InfoarenaAvatarTestCase(TestCase):
+    @staticmethod
+    def get_page(page_url, headers=None):
+        response = requests.Response()
+        if headers and headers.get('If-None-Match') == '"v1"':
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response._content = b'avatar'
+            response.headers['ETag'] = '"v1"'
+        return response
+
+    def test_unchanged_avatar_is_not_downloaded(self):
+        with mock.patch('scraper.scrapers.infoarena.utils.get_page',
+                        side_effect=self.get_page) as get_page:
+            first_hash = infoarena_utils.get_default_avatar_hash()
+            second_hash = infoarena_utils.get_default_avatar_hash()
+        self.assertEqual(first_hash, second_hash)
+        self.assertEqual(get_page.call_args_list[1][1]['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual(AvatarInfo.objects.get().sha1, first_hash)
+
+    def test_avatar_without_validators_is_downloaded(self):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'avatar'
+        with mock.patch('scraper.scrapers.infoarena.utils.get_page',
+                        return_value=response) as get_page:
+            first_hash = infoarena_utils.get_default_avatar_hash()
+            response._content = b'new avatar'
+            second_hash = infoarena_utils.get_default_avatar_hash()
+        self.assertNotEqual(first_hash, second_hash)
+        self.assertEqual(get_page.call_args_list[1][1]['headers'], {})
+
+
+class ParsingTestCase(TestCase):
+    PAGE = """
+        <html><body>
+        <div class="menu"><table><tr><td>Menu</td></tr></table></div>
+        <div id="monitor-table" class="container">
+            <div class="pager"><span class="count">2 rezultate</span></div>
+            <table class="status">
+                <tr><th>ID</th><th>User</th></tr>
+                <tr class="odd"><td><a href="/job/1">#1</a></td><td>user1</td></tr>
+                <tr class="even"><td><a href="/job/2">#2</a></td><td>user2</td></tr>
+            </table>
+        </div>
+        </body></html>
+    """
+
+    def test_strained_parse_finds_same_rows(self):
+        for selector in ['#monitor-table', '.container table', 'table.status']:
+            expected = [[td.text for td in tr.find_all('td')] for tr in
+                        BeautifulSoup(self.PAGE, 'html.parser').select_one(selector).find_all('tr')]
+            for parser in ['html.parser', parsing.DEFAULT_PARSER]:
+                table = parsing.select_one(self.PAGE, selector, parser=parser)
+                self.assertEqual([[td.text for td in tr.find_all('td')]
+                                  for tr in table.find_all('tr')], expected)
+
+    def test_unsupported_selector(self):
+        with self.assertRaises(ValueError):
+            parsing.get_strainer('a[href] td')
+
+
+class ReplayTestCase(TestCase):
+    STATUS_URL = "https://acm.timus.ru/status.aspx?space=1&count=1000"
+    STATUS_PAGE = b"""
+        <html><body><table class="status">
+        <tr class="odd">
+            <td>9000001</td>
+            <td><nobr>12:30:00</nobr><br><nobr>1 Feb 2021</nobr></td>
+            <td><a href="author.aspx?id=123">user</a></td>
+            <td>1000. A+B Problem</td>
+            <td>G++ 9.2</td>
+            <td>Accepted</td>
+            <td></td>
+            <td>0.015</td>
+            <td>1 024 KB</td>
+        </tr>
+        </table></body></html>
+    """
+
+    def setUp(self):
+        fixtures_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(fixtures_dir.cleanup)
+        self.fixtures_dir = fixtures_dir.name
+
+    def __get_submission_ids(self):
+        return [submission['submission_id'] for submission in
+                scrapers.TimusScraper().scrape_recent_submissions()]
+
+    def test_record_then_replay(self):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.STATUS_PAGE
+        with mock.patch('requests.adapters.HTTPAdapter.send', return_value=response) as send, \
+                replay.use_fixtures(self.fixtures_dir, replay.RECORD) as adapter:
+            self.assertEqual(self.__get_submission_ids(), ['9000001'])
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(adapter.request_count['timus'], 1)
+
+        with mock.patch('requests.adapters.HTTPAdapter.send') as send, \
+                replay.use_fixtures(self.fixtures_dir, replay.REPLAY) as adapter:
+            self.assertEqual(self.__get_submission_ids(), ['9000001'])
+        send.assert_not_called()
+        self.assertEqual(adapter.request_count['timus'], 1)
+
+    def test_missing_fixture(self):
+        with replay.use_fixtures(self.fixtures_dir, replay.REPLAY) as adapter:
+            with self.assertRaises(replay.FixtureNotFound):
+                self.__get_submission_ids()
+        self.assertEqual(adapter.missing_count['timus'], 1)
+        self.assertIsNone(replay.get_adapter())
+
+
+class WriteSubmissionsTestCase(TestCase):
+    def setUp(self):
+        judge = Judge.objects.create(judge_id='ia')
+        Task.objects.create(judge=judge, task_id='adunare')
+        user = User.objects.create_user(username='testuser', password='12345').profile
+        UserHandle.objects.create(judge=judge, handle='ia_user', user=user)
+        self.written_counts = []
+
+    def scrape(self, count):
+        for submission_id in range(count):
+            # Everything scraped before this was written, up to the last chunk.
+            self.written_counts.append(Submission.objects.count())
+            yield dict(
+                judge_id='ia', submission_id=str(submission_id),
+                author_id='IA_User', task_id='adunare', verdict='AC',
+                submitted_on=datetime.now() - timedelta(minutes=submission_id))
+
+    def test_writes_in_chunks(self):
+        self.assertEqual(queries.write_submissions(self.scrape(25), chunk_size=10), 25)
+        self.assertEqual(Submission.objects.count(), 25)
+        self.assertEqual(self.written_counts, [0] * 10 + [10] * 10 + [20] * 5)
+
+    def test_updates_rejudged_submissions(self):
+        submission = dict(
+            judge_id='ia', submission_id='1', author_id='ia_user', task_id='adunare',
+            verdict='WA', submitted_on=datetime.now(), memory_used=256)
+        queries.write_submissions([submission, dict(submission, submission_id='2')])
+
+        # Rejudged, scraped without memory, along with a duplicate.
+        with mock.patch.object(queries.log, 'info') as log_info:
+            queries.write_submissions([dict(submission, verdict='AC', memory_used=None),
+                                       dict(submission, verdict='AC', memory_used=None),
+                                       dict(submission, submission_id='2'),
+                                       dict(submission, submission_id='3')])
+        log_info.assert_any_call("Upserted 3 submissions (1 created, 1 updated)")
+        updated = Submission.objects.get(submission_id='1')
+        self.assertEqual((updated.verdict, updated.memory_used), ('AC', 256))
+        self.assertEqual(Submission.objects.count(), 3)
+        self.assertEqual(Submission.objects.best().get(), updated)
+
+    def test_copy_submissions(self):
+        queries.write_submissions(self.scrape(3))
+        Submission.objects.filter(submission_id='0').update(verdict='WA')
+        submissions = list(self.scrape(5)) + [
+            # Unknown task, and a language in need of escaping.
+            dict(judge_id='ia', submission_id='5', author_id='ia_user', task_id='scadere',
+                 verdict='AC', submitted_on=datetime.now()),
+            dict(judge_id='ia', submission_id='6', author_id='ia_user', task_id='adunare',
+                 verdict='AC', submitted_on=datetime.now(), language='C\t++\\n'),
+        ]
+        self.assertEqual(queries.copy_submissions(iter(submissions)), (3, 1))
+        self.assertEqual(Submission.objects.get(submission_id='0').verdict, 'AC')
+        self.assertEqual(Submission.objects.get(submission_id='6').language, 'C\t++\\n')
+        self.assertEqual(Submission.objects.count(), 6)
+        self.assertEqual(Submission.objects.best().get().submission_id, '4')
+        self.assertEqual(Submission.objects.best(use_recent=True).get().submission_id, '6')
+
+    def test_copy_submissions_twice_in_a_transaction(self):
+        submissions = list(self.scrape(4))
+        with transaction.atomic():
+            self.assertEqual(queries.copy_submissions(iter(submissions[:2])), (2, 0))
+            self.assertEqual(queries.copy_submissions(iter(submissions[2:])), (2, 0))
+        self.assertEqual(Submission.objects.count(), 4)
+
+    def test_copy_submissions_duplicates(self):
+        first, second = [dict(sub, submission_id='0') for sub in self.scrape(2)]
+        second['verdict'] = 'WA'
+        self.assertEqual(queries.copy_submissions(iter([first, second])), (1, 0))
+        # The last of the duplicate rows wins.
+        self.assertEqual(Submission.objects.get().verdict, 'WA')
+
+
+class ResolutionCacheTestCase(TestCase):
+    def setUp(self):
+        self.judge = Judge.objects.create(judge_id='ia')
+        Judge.objects.create(judge_id='cf')
+        Task.objects.create(judge=self.judge, task_id='adunare')
+        self.user = User.objects.create_user(username='testuser', password='12345').profile
+        self.handle = UserHandle.objects.create(judge=self.judge, handle='ia_user', user=self.user)
+
+    def submission(self, submission_id, author_id='ia_user', judge_id='ia'):
+        return dict(judge_id=judge_id, submission_id=submission_id, author_id=author_id,
+                    task_id='adunare', verdict='AC', submitted_on=datetime.now())
+
+    def test_no_lookups_in_steady_state(self):
+        queries.write_submissions([self.submission('1'), self.submission('2', 'unknown')])
+        with CaptureQueriesContext(connection) as context:
+            queries.write_submissions([self.submission('3'), self.submission('4', 'unknown')])
+        # The upsert, then the best submissions and the stale statistics
+        # updates only (within a savepoint).
+        self.assertEqual([query['sql'].split()[0] for query in context.captured_queries],
+                         ['SAVEPOINT', 'INSERT', 'INSERT', 'WITH', 'RELEASE'])
+        self.assertEqual(Submission.objects.count(), 2)
+
+    def test_invalidation(self):
+        queries.write_submissions([self.submission('1', 'new_user')])
+        UserHandle.objects.create(judge=self.judge, handle='New_User', user=self.user)
+        queries.write_submissions([self.submission('2', 'new_user')])
+        self.assertTrue(Submission.objects.filter(author__handle='New_User').exists())
+
+        self.handle.handle = 'renamed'
+        self.handle.save()
+        self.assertEqual(resolution.handles.resolve('ia', ['ia_user', 'renamed']),
+                         {'renamed': self.handle.pk})
+
+    def test_scoped_by_judge(self):
+        Task.objects.create(judge=Judge.objects.get(judge_id='cf'), task_id='adunare')
+        self.assertEqual(resolution.tasks.resolve('ia', ['adunare']),
+                         {'adunare': Task.objects.get(judge=self.judge).pk})
+
+
+class WriteTasksTestCase(TestCase):
+    def setUp(self):
+        self.judge = Judge.objects.create(judge_id='ia')
+        MethodTag.objects.create(tag_id='dp', tag_name='Dynamic programming')
+
+    def task_info(self, task_id, **kwargs):
+        return dict(dict(judge_id='ia', task_id=task_id, title=task_id.title(),
+                         statement='Sum two numbers.', examples=[], time_limit=100,
+                         source='ONI 2010', tags=['dp', 'unknown'],
+                         total_submission_count=10), **kwargs)
+
+    def test_write_tasks(self):
+        Task.objects.create(judge=self.judge, task_id='adunare')
+        with CaptureQueriesContext(connection) as context:
+            queries.write_tasks([self.task_info('adunare'), self.task_info('scadere')])
+        few_tasks_query_count = len(context.captured_queries)
+        with CaptureQueriesContext(connection) as context:
+            queries.write_tasks([self.task_info(f'task{i}') for i in range(20)])
+        self.assertEqual(len(context.captured_queries), few_tasks_query_count)
+
+        task = Task.objects.get(task_id='adunare')
+        self.assertEqual(task.name, 'Adunare')
+        self.assertEqual(task.source.source_id, 'oni-2010')
+        self.assertEqual([tag.tag_id for tag in task.tags.all()], ['dp'])
+        self.assertEqual(task.statement.time_limit_ms, 100)
+        self.assertEqual(task.judge_statistic.total_submission_count, 10)
+        self.assertEqual(Task.objects.count(), 22)
+        self.assertEqual(TaskSource.objects.count(), 1)
+
+    def test_keeps_user_modified_statements(self):
+        queries.write_tasks([self.task_info('adunare')])
+        TaskStatement.objects.update(modified_by_user=True, text='Edited.')
+        queries.write_tasks([self.task_info('adunare', memory_limit=1024,
+                                            total_submission_count=20)])
+
+        task = Task.objects.get(task_id='adunare')
+        self.assertEqual(task.statement.text, 'Edited.')
+        self.assertEqual(task.statement.memory_limit_kb, 1024)
+        self.assertEqual(task.judge_statistic.total_submission_count, 10)
+
+    def test_skips_unchanged_tasks(self):
+        self.assertEqual(queries.write_tasks([self.task_info('adunare')]), (1, 0))
+        modified_at = Task.objects.get(task_id='adunare').modified_at
+        self.assertEqual(queries.write_tasks([self.task_info('adunare')]), (0, 0))
+        self.assertEqual(Task.objects.get(task_id='adunare').modified_at, modified_at)
+
+        self.assertEqual(queries.write_tasks([self.task_info('adunare', examples=[1])]), (0, 1))
+        task = Task.objects.get(task_id='adunare')
+        self.assertEqual(task.statement.examples, [1])
+        self.assertGreater(task.modified_at, modified_at)
+
+    def test_changed_tasks_send_post_save(self):
+        queries.write_tasks([self.task_info('adunare'), self.task_info('scadere')])
+        saved_tasks = []
+
+        def on_save(sender, instance, created, **kwargs):
+            saved_tasks.append((instance.task_id, created))
+
+        # E.g. the search index is updated on post_save.
+        post_save.connect(on_save, sender=Task)
+        try:
+            queries.write_tasks([self.task_info('adunare', title='Adunare mare'),
+                                 self.task_info('scadere'),
+                                 self.task_info('inmultire')])
+        finally:
+            post_save.disconnect(on_save, sender=Task)
+        self.assertCountEqual(saved_tasks, [('inmultire', True), ('adunare', False)])
+
+    def test_tasks_created_meanwhile(self):
+        bulk_create = Task.objects.bulk_create
+
+        def create_meanwhile(tasks, **kwargs):
+            # Another worker creates one of the tasks first.
+            Task.objects.create(judge=self.judge, task_id='adunare')
+            return bulk_create(tasks, **kwargs)
+
+        with mock.patch.object(Task.objects, 'bulk_create', side_effect=create_meanwhile):
+            self.assertEqual(queries.write_tasks(
+                [self.task_info('adunare'), self.task_info('scadere')]), (1, 1))
+        self.assertEqual(Task.objects.get(task_id='adunare').name, 'Adunare')
+        self.assertEqual(Task.objects.count(), 2)
+
+
+class WriteHandlesTestCase(TestCase):
+    def setUp(self):
+        self.judge = Judge.objects.create(judge_id='cf')
+        user = User.objects.create_user(username='testuser', password='12345').profile
+        UserHandle.objects.create(judge=self.judge, handle='Tourist', user=user,
+                                  photo_url='https://a.jpg')
+        UserHandle.objects.create(judge=self.judge, handle='petr', user=user)
+
+    def test_writes_changed_handles_only(self):
+        handles_info = [
+            dict(judge_id='cf', handle='tourist', photo_url='https://a.jpg',
+                 first_name='Gennady', last_name='Korotkevich', rating=3800),
+            dict(judge_id='cf', handle='petr', rating=3000),
+            dict(judge_id='cf', handle='unknown', rating=1500),
+        ]
+        queries.write_handles(handles_info)
+        tourist = UserHandle.objects.get(handle='Tourist')
+        self.assertEqual((tourist.first_name, tourist.rating), ('Gennady', 3800))
+        self.assertEqual(UserHandle.objects.get(handle='petr').rating, 3000)
+
+        with CaptureQueriesContext(connection) as context:
+            queries.write_handles(handles_info)
+        # The lookup only.
+        self.assertEqual(len(context.captured_queries), 1)
+
+
+class RecentSubmissionsTestCase(TestCase):
+    def scrape_recent_submissions(self, judge_id, delay):
+        for submission_id in itertools.count():
+            time.sleep(delay)
+            yield dict(judge_id=judge_id, submission_id=str(submission_id),
+                       submitted_on=datetime.now())
+            if delay == 0 and submission_id == 2:
+                return
+
+    def create_scraper(self, judge_id):
+        delay = 0.1 if judge_id == 'slow' else 0
+        return mock.Mock(scrape_recent_submissions=lambda: self.scrape_recent_submissions(
+            judge_id, delay))
+
+    def write_submissions(self, submissions):
+        submissions = list(submissions)
+        self.written[submissions[0]['judge_id']] = len(submissions)
+
+    @override_settings(SCRAPER_HTTP={'default': {'RECENT_SUBMISSIONS_TIMEOUT': 0.5}})
+    def test_slow_judge_does_not_stall_others(self):
+        self.written = {}
+        with mock.patch('scraper.scrapers.create_scraper', self.create_scraper), \
+                mock.patch('scraper.queries.write_submissions', self.write_submissions):
+            start = time.time()
+            services.scrape_recent_submissions('slow', 'fast')
+            self.assertLess(time.time() - start, 1)
+        self.assertEqual(self.written['fast'], 3)
+        self.assertLess(self.written['slow'], 6)
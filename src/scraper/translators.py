@@ -1,18 +1,20 @@
 import json
 import os
 import re
-import time
 
 from google.cloud import translate_v3 as translate
 from google.oauth2 import service_account
 
 from core import markdown
 from core.logging import log
+from scraper import ratelimit
 
 __client = None
 
 PROJECT_ID = "competitive-257117"
 PARENT = f"projects/{PROJECT_ID}/locations/us-central1"
+# Key of the translation API options in settings.SCRAPER_HTTP.
+TRANSLATE_ID = 'translate'
 
 def __get_client():
     global __client
@@ -67,7 +69,8 @@ def translate_ro_en(text: str, use_glossary=False):
     html_text = re.sub('modulo', 'mmoodduulloo', html_text)
 
     response = None
-    for tries in range(3):
+    for tries in range(5):
+        ratelimit.acquire(TRANSLATE_ID)
         try:
             response = client.translate_text(
                 parent=parent,
@@ -77,12 +80,13 @@ def translate_ro_en(text: str, use_glossary=False):
                 mime_type='text/html')
             break
         except Exception as ex:
-            if tries == 2:
+            if tries == 4:
                 raise
 
             if "RESOURCE_EXHAUSTED" in str(ex):
-                log.warning("RESOURCE_EXHAUSTED. Sleeping for 60s...")
-                time.sleep(60)
+                # The quota is per minute, so back off for all the workers.
+                delay = ratelimit.back_off(TRANSLATE_ID, tries)
+                log.warning(f"RESOURCE_EXHAUSTED. Backing off for {delay:.1f}s...")
 
     translated = response.translations
     translated = translated[0].translated_text
@@ -1,10 +1,9 @@
-import time
 import urllib
 from datetime import datetime
 import requests
 
 from core.logging import log
-from scraper import database
+from scraper import cache, database, ratelimit, sessions
 
 
 def split_into_chunks(iterable, chunk_size):
@@ -19,11 +18,40 @@ def split_into_chunks(iterable, chunk_size):
         yield buffer
 
 
-def get_page(page_url, max_retries=10, **query_dict):
+def __fetch_page(page_url, max_retries, headers=None):
+    judge_id = sessions.get_judge_id(page_url)
+    page = None
+    for tries in range(max_retries):
+        log.debug(f"GET: {page_url}")
+        try:
+            page = sessions.get(page_url, headers=headers)
+        except requests.exceptions.RequestException as ex:
+            if tries == max_retries - 1:
+                raise
+            delay = ratelimit.back_off(judge_id, tries)
+            log.warning(f'Request failed ({ex}). Backing off for {delay:.1f} seconds...')
+            log.info('Retrying...')
+            continue
+
+        if page.status_code in [200, 304, 400, 404]:
+            break
+        elif tries < max_retries - 1:
+            # The next request waits (in any process) until the judge is unblocked.
+            delay = ratelimit.back_off(judge_id, tries, page.headers.get('Retry-After'))
+            log.warning(f'Request failed (status code: {page.status_code}). '
+                        f'Backing off for {delay:.1f} seconds...')
+            log.info('Retrying...')
+    return page
+
+
+def get_page(page_url, max_retries=10, use_cache=False, headers=None, **query_dict):
     """
     Sends a GET request, while also printing the page to console.
     :param max_retries: the maximum number of retries
     :param page_url: the url of the GET request
+    :param use_cache: whether to go through the on-disk cache of pages
+    (meant for pages that rarely change, like task statements)
+    :param headers: extra request headers (e.g. for conditional requests)
     :param query_dict: the GET query parameters
     :return: the page received
     """
@@ -31,20 +59,16 @@ def get_page(page_url, max_retries=10, **query_dict):
         query_string = urllib.parse.urlencode(query_dict)
         page_url += "?" + query_string
 
-    page = None
-    for tries in range(max_retries):
-        log.debug(f"GET: {page_url}")
-        page = requests.get(page_url)
-        if page.status_code == 200 or page.status_code == 400 or page.status_code == 404:
-            break
-        else:
-            log.warning(f'Request failed (status code: {page.status_code}). Sleeping for 2 seconds...')
-            time.sleep(2)
-            log.info('Retrying...')
+    if use_cache:
+        page = cache.get_cached_page(
+            page_url, lambda cache_headers: __fetch_page(
+                page_url, max_retries, dict(headers or {}, **cache_headers)))
+    else:
+        page = __fetch_page(page_url, max_retries, headers)
 
     if not page:
         log.error("Request failed. Page not found.")
-    if page.status_code != 200:
+    if page.status_code not in [200, 304]:
         log.error("Request failed. Status code: %d" % page.status_code)
 
     return page
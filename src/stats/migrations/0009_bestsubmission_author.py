@@ -0,0 +1,49 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0053_taskstatement_content_hash'),
+        ('stats', '0008_ladderstatistics'),
+    ]
+
+    operations = [
+        # Best submissions were never computed, so there is nothing to keep.
+        migrations.DeleteModel(
+            name='BestSubmission',
+        ),
+        migrations.CreateModel(
+            name='BestSubmission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_submissions', to='data.userhandle')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_submissions', to='data.userprofile')),
+                ('recent_submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recent_best_of', to='data.submission')),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='best_of', to='data.submission')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_submissions', to='data.task')),
+            ],
+            options={
+                'unique_together': {('author', 'task')},
+            },
+        ),
+        # Submission.objects.best() reads from here from now on.
+        migrations.RunSQL("""
+            INSERT INTO stats_bestsubmission (profile_id, author_id, task_id, submission_id, recent_submission_id)
+            SELECT h.user_id, b.author_id, b.task_id, b.id, r.id
+            FROM (
+                SELECT DISTINCT ON (author_id, task_id) author_id, task_id, id
+                FROM data_submission
+                ORDER BY author_id, task_id, (verdict = 'AC') DESC,
+                    score DESC NULLS LAST, submitted_on ASC
+            ) b
+            INNER JOIN (
+                SELECT DISTINCT ON (author_id, task_id) author_id, task_id, id
+                FROM data_submission
+                ORDER BY author_id, task_id, (verdict = 'AC') DESC,
+                    score DESC NULLS LAST, submitted_on DESC
+            ) r USING (author_id, task_id)
+            INNER JOIN data_userhandle h ON h.id = b.author_id
+        """, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.1.14 on 2026-10-18 16:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0053_taskstatement_content_hash'),
+        ('stats', '0009_bestsubmission_author'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleTaskStatistics',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='data.task')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StaleUserStatistics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='data.userprofile')),
+            ],
+        ),
+    ]
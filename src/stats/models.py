@@ -1,6 +1,6 @@
 from django.db import models
 import math
-from data.models import Task, UserProfile, Submission
+from data.models import Task, UserProfile, UserHandle, Submission
 from django.contrib.postgres.fields import JSONField
 
 from ladders.models import Ladder
@@ -44,9 +44,34 @@ class LadderStatistics(models.Model):
 
 
 class BestSubmission(models.Model):
+    """
+    The best submission of an author on a task (see SubmissionQuerySet.best()),
+    both the earliest and the most recent of the equally good ones.
+    Kept up to date by the writes of the submissions (see stats.queries).
+    """
     profile = models.ForeignKey(UserProfile, related_name='best_submissions', on_delete=models.CASCADE)
+    author = models.ForeignKey(UserHandle, related_name='best_submissions', on_delete=models.CASCADE)
     task = models.ForeignKey(Task, related_name='best_submissions', on_delete=models.CASCADE)
-    submission = models.OneToOneField(Submission, on_delete=models.CASCADE)
+    submission = models.OneToOneField(Submission, related_name='best_of', on_delete=models.CASCADE)
+    recent_submission = models.OneToOneField(Submission, related_name='recent_best_of',
+                                             on_delete=models.CASCADE)
 
     class Meta:
-        unique_together = (('profile', 'task'),)
+        unique_together = (('author', 'task'),)
+
+
+class StaleUserStatistics(models.Model):
+    """
+    A user whose submissions changed since their UserStatistics were computed
+    (marked by the writes of the submissions, see stats.queries).
+    """
+    user = models.OneToOneField(UserProfile, on_delete=models.CASCADE, primary_key=True,
+                                related_name='+')
+
+
+class StaleTaskStatistics(models.Model):
+    """
+    A task whose submissions changed since its TaskStatistics were computed.
+    """
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, primary_key=True,
+                                related_name='+')
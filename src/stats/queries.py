@@ -0,0 +1,301 @@
+from django.db import connection
+from psycopg2.extras import execute_values
+
+from data.models import Submission, UserHandle, Task, MethodTag
+from info.models import FavoriteTask
+from stats.models import BestSubmission, TaskStatistics, UserStatistics, \
+    StaleUserStatistics, StaleTaskStatistics
+
+
+def __get_ids_filter(column, ids):
+    # Restricts a query to some ids (passed as the `ids` parameter), if any.
+    if ids is None:
+        return 'TRUE'
+    return f"{column} = ANY(%(ids)s)"
+
+
+def __get_best_submissions_sql(where='TRUE'):
+    # Same order as SubmissionQuerySet.best(): accepted first, then by score,
+    # then the earliest (or, for the recent one, the latest) submission.
+    submissions = Submission._meta.db_table
+    best = BestSubmission._meta.db_table
+
+    def ranked(direction):
+        return f"""
+            SELECT DISTINCT ON (author_id, task_id) author_id, task_id, id
+            FROM {submissions}
+            WHERE {where}
+            ORDER BY author_id, task_id, (verdict = 'AC') DESC,
+                score DESC NULLS LAST, submitted_on {direction}
+        """
+
+    return f"""
+        INSERT INTO {best} (profile_id, author_id, task_id, submission_id, recent_submission_id)
+        SELECT h.user_id, b.author_id, b.task_id, b.id, r.id
+        FROM ({ranked('ASC')}) b
+        INNER JOIN ({ranked('DESC')}) r USING (author_id, task_id)
+        INNER JOIN {UserHandle._meta.db_table} h ON h.id = b.author_id
+        ON CONFLICT (author_id, task_id) DO UPDATE
+        SET (profile_id, submission_id, recent_submission_id) =
+            ROW(EXCLUDED.profile_id, EXCLUDED.submission_id, EXCLUDED.recent_submission_id)
+        WHERE ({best}.profile_id, {best}.submission_id, {best}.recent_submission_id)
+            IS DISTINCT FROM
+            (EXCLUDED.profile_id, EXCLUDED.submission_id, EXCLUDED.recent_submission_id)
+    """
+
+
+def update_best_submissions(pairs):
+    """
+    Updates the best submissions of some (author, task) pairs, e.g. after
+    writing their submissions. Only the submissions of those pairs are read.
+    Their statistics are marked as stale too (see mark_stale_statistics()).
+    :param pairs: iterable of (UserHandle pk, Task pk) tuples
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    author_ids, task_ids = zip(*pairs)
+    with connection.cursor() as cursor:
+        cursor.execute(__get_best_submissions_sql(
+            "(author_id, task_id) IN (SELECT * FROM unnest(%s::integer[], %s::integer[]))"),
+            # Once for the best, once for the most recent best submissions.
+            [list(author_ids), list(task_ids)] * 2)
+    mark_stale_statistics(pairs)
+
+
+def mark_stale_statistics(pairs):
+    """
+    Marks the statistics of the users and the tasks of some (author, task)
+    pairs as stale, to be recomputed by stats.services.update_statistics().
+    :param pairs: iterable of (UserHandle pk, Task pk) tuples
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    author_ids, task_ids = zip(*pairs)
+    with connection.cursor() as cursor:
+        # Sorted, so that concurrent writes do not deadlock.
+        cursor.execute(f"""
+            WITH stale_users AS (
+                INSERT INTO {StaleUserStatistics._meta.db_table} (user_id)
+                SELECT DISTINCT user_id FROM {UserHandle._meta.db_table}
+                WHERE id = ANY(%s) ORDER BY user_id
+                ON CONFLICT DO NOTHING
+            )
+            INSERT INTO {StaleTaskStatistics._meta.db_table} (task_id)
+            SELECT DISTINCT task_id FROM unnest(%s::integer[]) AS t(task_id) ORDER BY task_id
+            ON CONFLICT DO NOTHING
+        """, [list(set(author_ids)), list(set(task_ids))])
+
+
+def claim_stale_statistics(users=True, tasks=True):
+    """
+    Unmarks the stale statistics (of the users, of the tasks, or both), which
+    are to be recomputed within the same transaction, so that they stay
+    marked if that fails.
+    :return: a (UserProfile pks, Task pks) tuple
+    """
+    user_ids, task_ids = [], []
+    with connection.cursor() as cursor:
+        if users:
+            cursor.execute(f"DELETE FROM {StaleUserStatistics._meta.db_table} RETURNING user_id")
+            user_ids = [user_id for user_id, in cursor.fetchall()]
+        if tasks:
+            cursor.execute(f"DELETE FROM {StaleTaskStatistics._meta.db_table} RETURNING task_id")
+            task_ids = [task_id for task_id, in cursor.fetchall()]
+    return user_ids, task_ids
+
+
+def update_all_best_submissions():
+    """
+    Recomputes the best submissions of all the (author, task) pairs.
+    :return: the number of rows that changed
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            DELETE FROM {BestSubmission._meta.db_table} b WHERE NOT EXISTS (
+                SELECT 1 FROM {Submission._meta.db_table} s
+                WHERE s.author_id = b.author_id AND s.task_id = b.task_id)
+        """)
+        deleted = cursor.rowcount
+        cursor.execute(__get_best_submissions_sql())
+        return deleted + cursor.rowcount
+
+
+def update_task_statistics(difficulty_scores=None, task_ids=None):
+    """
+    Recomputes the TaskStatistics of some tasks with a few grouped
+    aggregates, written with a single upsert.
+    :param difficulty_scores: a dict from Task pks to their difficulty score
+    (if None, the current difficulty scores are kept, and new tasks get the
+    score of the unrated tasks, see stats.services.compute_task_statistics())
+    :param task_ids: the pks of the tasks to recompute (if None, all of them)
+    :return: the number of rows that changed
+    """
+    statistics = TaskStatistics._meta.db_table
+    submissions = Submission._meta.db_table
+    columns = ['users_tried_count', 'users_solved_count', 'submission_count',
+               'favorited_count', 'difficulty_score']
+    updated_columns = columns if difficulty_scores is not None else columns[:-1]
+    difficulty_scores = difficulty_scores or {}
+
+    def where(column):
+        return __get_ids_filter(column, task_ids)
+
+    sql = f"""
+        INSERT INTO {statistics} (task_id, {', '.join(columns)})
+        SELECT t.id, COALESCE(b.tried_count, 0), COALESCE(b.solved_count, 0),
+            COALESCE(s.submission_count, 0), COALESCE(f.favorited_count, 0),
+            COALESCE(d.difficulty_score, u.difficulty_score, 1)
+        FROM {Task._meta.db_table} t
+        LEFT JOIN (
+            SELECT b.task_id, COUNT(*) AS tried_count,
+                COUNT(*) FILTER (WHERE s.verdict = 'AC') AS solved_count
+            FROM {BestSubmission._meta.db_table} b
+            INNER JOIN {submissions} s ON s.id = b.submission_id
+            WHERE {where('b.task_id')}
+            GROUP BY b.task_id
+        ) b ON b.task_id = t.id
+        LEFT JOIN (
+            SELECT task_id, COUNT(*) AS submission_count
+            FROM {submissions} WHERE {where('task_id')} GROUP BY task_id
+        ) s ON s.task_id = t.id
+        LEFT JOIN (
+            SELECT task_id, COUNT(*) AS favorited_count
+            FROM {FavoriteTask._meta.db_table} WHERE {where('task_id')} GROUP BY task_id
+        ) f ON f.task_id = t.id
+        LEFT JOIN unnest(%(task_ids)s::integer[], %(scores)s::integer[])
+            AS d(task_id, difficulty_score)
+            ON d.task_id = t.id
+        -- Unrated tasks are rated as the hardest ones, so they got the highest score.
+        CROSS JOIN (SELECT MAX(difficulty_score) AS difficulty_score FROM {statistics}) u
+        WHERE {where('t.id')}
+        ON CONFLICT (task_id) DO UPDATE
+        SET ({', '.join(updated_columns)}) = ROW({', '.join('EXCLUDED.' + c for c in updated_columns)})
+        WHERE ({', '.join(f'{statistics}.{c}' for c in updated_columns)})
+            IS DISTINCT FROM ({', '.join('EXCLUDED.' + c for c in updated_columns)})
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {
+            'ids': list(task_ids) if task_ids is not None else None,
+            'task_ids': list(difficulty_scores.keys()),
+            'scores': list(difficulty_scores.values()),
+        })
+        return cursor.rowcount
+
+
+def get_best_submission_counts(user_ids=None):
+    """
+    Counts the tasks tried and solved by each user (from their best
+    submissions, see BestSubmission), and the points of the solved ones.
+    :param user_ids: the UserProfile pks to count for (if None, all of them)
+    :return: a dict from UserProfile pks to (tried count, solved count, points)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT b.profile_id, COUNT(*), COUNT(*) FILTER (WHERE s.verdict = 'AC'),
+                COALESCE(SUM(ts.difficulty_score) FILTER (WHERE s.verdict = 'AC'), 0)
+            FROM {BestSubmission._meta.db_table} b
+            INNER JOIN {Submission._meta.db_table} s ON s.id = b.submission_id
+            LEFT JOIN {TaskStatistics._meta.db_table} ts ON ts.task_id = b.task_id
+            WHERE {__get_ids_filter('b.profile_id', user_ids)}
+            GROUP BY b.profile_id
+        """, {'ids': user_ids})
+        return {profile_id: counts for profile_id, *counts in cursor.fetchall()}
+
+
+def get_solved_tag_counts(user_ids=None):
+    """
+    Counts the solved tasks of each user, by tag.
+    :param user_ids: the UserProfile pks to count for (if None, all of them)
+    :return: a dict from UserProfile pks to lists of (tag name, count) tuples
+    """
+    tags = Task.tags.through
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT b.profile_id, t.tag_name, COUNT(*)
+            FROM {BestSubmission._meta.db_table} b
+            INNER JOIN {Submission._meta.db_table} s ON s.id = b.submission_id
+            INNER JOIN {tags._meta.db_table} tt ON tt.task_id = b.task_id
+            INNER JOIN {MethodTag._meta.db_table} t ON t.id = tt.methodtag_id
+            WHERE s.verdict = 'AC' AND {__get_ids_filter('b.profile_id', user_ids)}
+            GROUP BY b.profile_id, t.id
+            ORDER BY b.profile_id, t.tag_name
+        """, {'ids': user_ids})
+        solved_counts = {}
+        for profile_id, tag_name, count in cursor.fetchall():
+            solved_counts.setdefault(profile_id, []).append((tag_name, count))
+        return solved_counts
+
+
+def get_monthly_activity(since, user_ids=None):
+    """
+    Counts the submissions of each user, by month.
+    :param since: the date of the oldest submissions counted
+    :param user_ids: the UserProfile pks to count for (if None, all of them)
+    :return: a dict from UserProfile pks to dicts from month ids
+    (see stats.utils.get_month_id_from_date()) to (total, accepted) counts
+    """
+    submissions = Submission._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT h.user_id,
+                (EXTRACT(YEAR FROM s.submitted_on) * 12 + EXTRACT(MONTH FROM s.submitted_on) - 1)::integer
+                    AS month_id,
+                COUNT(*), COUNT(*) FILTER (WHERE s.verdict = 'AC')
+            FROM {submissions} s
+            INNER JOIN {UserHandle._meta.db_table} h ON h.id = s.author_id
+            WHERE s.submitted_on >= %(since)s AND {__get_ids_filter('h.user_id', user_ids)}
+            GROUP BY h.user_id, month_id
+        """, {'since': since, 'ids': user_ids})
+        activity = {}
+        for profile_id, month_id, total_count, ac_count in cursor.fetchall():
+            activity.setdefault(profile_id, {})[month_id] = (total_count, ac_count)
+        return activity
+
+
+def write_user_statistics(user_statistics):
+    """
+    Writes the UserStatistics of many users with a single upsert,
+    touching only the rows that changed. Ranks are left as they are
+    (new rows get none), for update_ranks() to set.
+    :param user_statistics: list of (unsaved) UserStatistics
+    :return: the number of rows that changed
+    """
+    statistics = UserStatistics._meta.db_table
+    fields = [field for field in UserStatistics._meta.concrete_fields if not field.primary_key]
+    columns = [field.column for field in fields]
+    updated_columns = [column for column in columns if column not in ['user_id', 'rank']]
+    rows = [tuple(field.get_db_prep_save(getattr(stat, field.attname), connection)
+                  for field in fields)
+            for stat in user_statistics]
+    if not rows:
+        return 0
+    with connection.cursor() as cursor:
+        execute_values(cursor, f"""
+            INSERT INTO {statistics} ({', '.join(columns)}) VALUES %s
+            ON CONFLICT (user_id) DO UPDATE
+            SET ({', '.join(updated_columns)}) = ROW({', '.join('EXCLUDED.' + c for c in updated_columns)})
+            WHERE ({', '.join(f'{statistics}.{c}' for c in updated_columns)})
+                IS DISTINCT FROM ({', '.join('EXCLUDED.' + c for c in updated_columns)})
+        """, rows, page_size=len(rows))
+        return cursor.rowcount
+
+
+def update_ranks(model):
+    """
+    Ranks statistics by their total points (tied ones share a rank, which
+    leaves a gap after them), in a single statement.
+    :param model: UserStatistics or LadderStatistics
+    :return: the number of ranks that changed
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {table} SET rank = ranked.rank
+            FROM (
+                SELECT id, RANK() OVER (ORDER BY total_points DESC) AS rank FROM {table}
+            ) ranked
+            WHERE {table}.id = ranked.id AND {table}.rank IS DISTINCT FROM ranked.rank
+        """)
+        return cursor.rowcount
@@ -1,12 +1,14 @@
 import json
+import time
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 
 from core.logging import log
-from data.models import Submission, UserProfile, Task, Judge
+from data.models import UserProfile, Task
 from ladders.models import Ladder, LadderTask
-from stats import utils, multipliers
-from .models import TaskStatistics, UserStatistics, BestSubmission, LadderStatistics
+from stats import utils, multipliers, queries
+from .models import UserStatistics, LadderStatistics
 
 from celery import shared_task
 
@@ -20,69 +22,47 @@ def normalize_range(val, min=0, max=2e9, step=1):
 def compute_task_statistics():
     """
     Computes a TaskStatistic object for each task,
-    which it saves to the database
+    which it saves to the database (all at once)
     """
     log.info('Computing task statistics...')
+    start = time.perf_counter()
 
     BASE_SCORE = 100
 
     task_ratings, user_ratings = multipliers.compute_task_and_user_ratings(
         augment_from_mongo=False)
+    # Unrated tasks are rated as the hardest ones (as in update_statistics()).
     default_multiplier = max(task_ratings.values())
 
-    def get_multiplier(task):
-        return task_ratings.get(task.id, default_multiplier)
-
-    task_count = 0
-    for task in Task.objects.all():
-        users_solved_count = Submission.objects.best().filter(task=task, verdict='AC').count()
-        users_tried_count = Submission.objects.best().filter(task=task).count()
-        submission_count = Submission.objects.filter(task=task).count()
-        favorited_count = task.favorite_users.count()
-
-        TaskStatistics.objects.update_or_create(
-            task=task, defaults=dict(
-                users_tried_count=users_tried_count,
-                users_solved_count=users_solved_count,
-                submission_count=submission_count,
-                favorited_count=favorited_count,
-            ))
-        task_count += 1
-
-    if task_count == 0:
+    task_multipliers = {task_id: task_ratings.get(task_id, default_multiplier)
+                        for task_id in Task.objects.values_list('id', flat=True)}
+    if not task_multipliers:
         return
 
-    mean_multiplier = sum([
-        get_multiplier(task) for task in Task.objects.all()])
-    mean_multiplier /= task_count
-
+    mean_multiplier = sum(task_multipliers.values()) / len(task_multipliers)
     log.info(f'MEAN MULTIPLIER: {mean_multiplier}')
 
-    scores = {task: normalize_range(BASE_SCORE * get_multiplier(task) / mean_multiplier,
-                                    min=5, max=1000, step=5)
-              for task in Task.objects.all()}
-    log.info(scores)
-
-    for task in Task.objects.select_related('statistics'):
-        statistics = task.statistics
-        statistics.difficulty_score = scores[task]
-        statistics.save()
-
-
-def compute_ranks(elems, key, reverse=False):
-    elems = list(elems)
-    old_best = None
-    current_rank = 1
-    next_rank = 1
-    ranks = [None] * len(elems)
-    for idx in sorted(range(len(elems)), key=lambda x: key(elems[x]), reverse=reverse):
-        elem_key = key(elems[idx])
-        if old_best is None or elem_key != old_best:
-            current_rank = next_rank
-        old_best = elem_key
-        ranks[idx] = current_rank
-        next_rank += 1
-    return ranks
+    scores = {task_id: int(normalize_range(BASE_SCORE * multiplier / mean_multiplier,
+                                           min=5, max=1000, step=5))
+              for task_id, multiplier in task_multipliers.items()}
+    with transaction.atomic():
+        # Everything gets recomputed anyway.
+        queries.claim_stale_statistics(users=False, tasks=True)
+        changed_count = queries.update_task_statistics(scores)
+    log.info(f'Computed statistics of {len(scores)} tasks ({changed_count} changed) '
+             f'in {time.perf_counter() - start:.2f}s')
+
+
+@shared_task
+def compute_best_submissions():
+    """
+    Recomputes all the BestSubmission objects. These are kept up to date
+    as the submissions are written, so this only repairs what was missed
+    (e.g. submissions changed by hand through raw SQL).
+    """
+    log.info('Computing best submissions...')
+    changed_count = queries.update_all_best_submissions()
+    log.info(f'{changed_count} best submissions changed.')
 
 
 @shared_task
@@ -101,64 +81,76 @@ def compute_ladder_statistics():
             pass
         scores[ladder] = score
 
-    stats = []
-    for ladder in Ladder.objects.all():
-        stat, _ = LadderStatistics.objects.update_or_create(
-            ladder=ladder,
-            defaults=dict(
-                total_points=scores.get(ladder, 0)
-            ))
-        stats.append(stat)
+    with transaction.atomic():
+        for ladder in Ladder.objects.all():
+            LadderStatistics.objects.update_or_create(
+                ladder=ladder,
+                defaults=dict(
+                    total_points=scores.get(ladder, 0)
+                ))
+        queries.update_ranks(LadderStatistics)
 
-    ranks = compute_ranks(stats, key=lambda x: x.total_points, reverse=True)
-    for stat, rank in zip(stats, ranks):
-        stat.rank = rank
 
-    for stat in stats:
-        stat.save(force_update=True)
+def __write_user_statistics(user_ids):
+    """
+    Computes the UserStatistic objects of some users, then saves them
+    to the database (all at once).
+    :return: the number of rows that changed
+    """
+    counts = queries.get_best_submission_counts(user_ids)
+    tag_counts = queries.get_solved_tag_counts(user_ids)
+    activity = queries.get_monthly_activity(since=utils.get_activity_start(), user_ids=user_ids)
+
+    user_statistics = []
+    for user_id in user_ids:
+        tasks_tried_count, tasks_solved_count, total_points = counts.get(user_id, (0, 0, 0))
+        user_statistics.append(UserStatistics(
+            user_id=user_id,
+            tasks_solved_count=tasks_solved_count,
+            tasks_tried_count=tasks_tried_count,
+            total_points=total_points,
+            activity=json.dumps(utils.build_activity_dict(activity.get(user_id, {}))),
+            tag_stats=json.dumps(utils.build_tag_stats_dict(tag_counts.get(user_id, []))),
+        ))
+    return queries.write_user_statistics(user_statistics)
 
 
 @shared_task
 def compute_user_statistics():
     """
     Computes UserStatistic objects,
-    which it saves to the database
+    which it saves to the database (all at once)
     """
-    def make_user_stat(user):
-        submissions = Submission.objects.best().filter(author__in=user.handles.all())
-
-        tasks_solved_count = submissions.filter(verdict='AC').count()
-        tasks_tried_count = submissions.count()
-        activity_dict = utils.build_activity_dict(user)
-        tag_stats_dict = utils.build_tag_stats_dict(user)
-
-        total_points = 0
-        for submission in submissions.filter(verdict='AC').all():
-            try:
-                total_points += submission.task.statistics.difficulty_score
-            except ObjectDoesNotExist:
-                pass
-
-        statistic, _ = UserStatistics.objects.update_or_create(
-            user=user,
-            defaults=dict(
-                tasks_solved_count=tasks_solved_count,
-                tasks_tried_count=tasks_tried_count,
-                total_points=total_points,
-                activity=json.dumps(activity_dict),
-                tag_stats=json.dumps(tag_stats_dict),
-            ))
-        return statistic
-
-    # Make statistics.
-    user_statistics = [make_user_stat(user) for user in UserProfile.objects.all()]
-
-    # Compute ranks.
-    ranks = compute_ranks(user_statistics, key=lambda stat: stat.total_points, reverse=True)
-    # Save.
-    for stat, rank in zip(user_statistics, ranks):
-        stat.rank = rank
-
-    for stat in user_statistics:
-        stat.save(force_update=True)
+    log.info('Computing user statistics...')
+    start = time.perf_counter()
+
+    with transaction.atomic():
+        # Everything gets recomputed anyway.
+        queries.claim_stale_statistics(users=True, tasks=False)
+        user_ids = list(UserProfile.objects.values_list('id', flat=True))
+        changed_count = __write_user_statistics(user_ids)
+        queries.update_ranks(UserStatistics)
+    log.info(f'Computed statistics of {len(user_ids)} users ({changed_count} changed) '
+             f'in {time.perf_counter() - start:.2f}s')
+
 
+@shared_task
+def update_statistics():
+    """
+    Recomputes the statistics of the users and the tasks whose submissions
+    changed since the last time (see stats.queries.mark_stale_statistics()).
+    Difficulty scores are only refitted by compute_task_statistics(), which
+    (along with compute_user_statistics()) reconciles everything periodically.
+    """
+    start = time.perf_counter()
+    with transaction.atomic():
+        user_ids, task_ids = queries.claim_stale_statistics()
+        if not user_ids and not task_ids:
+            return
+        task_changed_count = queries.update_task_statistics(task_ids=task_ids)
+        user_changed_count = __write_user_statistics(user_ids)
+        if user_changed_count > 0:
+            queries.update_ranks(UserStatistics)
+    log.info(f'Updated statistics of {len(user_ids)} users ({user_changed_count} changed) '
+             f'and {len(task_ids)} tasks ({task_changed_count} changed) '
+             f'in {time.perf_counter() - start:.2f}s')
@@ -1,5 +1,5 @@
 from cpaggregator.celery import app
-from .services import compute_task_statistics, compute_user_statistics, compute_best_submissions
+from .services import compute_task_statistics, compute_user_statistics
 
 
 @app.on_after_configure.connect
@@ -9,14 +9,7 @@ def setup_periodic_tasks(sender, **kwargs):
         5, # * 60,
         compute_user_statistics,
         name='compute user statistics')
-    sender.add_periodic_task(
-        1,  # * 60,
-        compute_best_submissions,
-        name='compute best submissions')
     sender.add_periodic_task(
         5, # * 60,
         compute_task_statistics,
         name='compute task statistics')
-
-print('HAI PIZDA')
-print(app.conf.beat_schedule)
\ No newline at end of file
@@ -1,3 +1,144 @@
+import json
+from datetime import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from pytz import UTC
+
+from data.models import UserHandle, Judge, Task, Submission, MethodTag
+from info.models import FavoriteTask
+from stats import services
+from stats.models import TaskStatistics, UserStatistics, StaleUserStatistics, StaleTaskStatistics
+
+
+class StatisticsTestCase(TestCase):
+    today = datetime(2010, 1, 1, tzinfo=UTC)
+
+    def setUp(self):
+        judge = Judge.objects.create(judge_id='ia')
+        self.tasks = [Task.objects.create(judge=judge, task_id=task_id)
+                      for task_id in ['adunare', 'scadere', 'inmultire']]
+        self.users = [User.objects.create_user(username=username, password='12345').profile
+                      for username in ['user1', 'user2']]
+        self.handles = [UserHandle.objects.create(judge=judge, handle=user.username, user=user)
+                        for user in self.users]
+
+    def submit(self, submission_id, handle, task, verdict, submitted_on=today):
+        Submission.objects.create(
+            submission_id=submission_id, submitted_on=submitted_on, task=task,
+            author=handle, language='C++', verdict=verdict)
+
+    @mock.patch.object(services.multipliers, 'compute_task_and_user_ratings')
+    def test_compute_task_statistics(self, compute_ratings):
+        adunare, scadere, inmultire = self.tasks
+        self.submit('1', self.handles[0], adunare, 'WA')
+        self.submit('2', self.handles[0], adunare, 'AC')
+        self.submit('3', self.handles[1], adunare, 'WA')
+        self.submit('4', self.handles[1], scadere, 'TLE')
+        FavoriteTask.objects.create(task=scadere, profile=self.users[0])
+        compute_ratings.return_value = ({adunare.pk: 1., scadere.pk: 2.}, {})
+
+        services.compute_task_statistics()
+        statistics = {stat.task: (stat.users_tried_count, stat.users_solved_count,
+                                  stat.submission_count, stat.favorited_count, stat.difficulty_score)
+                      for stat in TaskStatistics.objects.all()}
+        # Tasks without ratings are rated as the hardest ones (mean multiplier 5/3).
+        self.assertEqual(statistics, {
+            adunare: (2, 1, 3, 0, 60),
+            scadere: (1, 0, 1, 1, 120),
+            inmultire: (0, 0, 0, 0, 120),
+        })
+
+        # Only what changed is written again.
+        self.submit('5', self.handles[1], adunare, 'AC')
+        self.assertEqual(services.queries.update_task_statistics(
+            {adunare.pk: 60, scadere.pk: 120, inmultire.pk: 120}), 1)
+        self.assertEqual(TaskStatistics.objects.get(task=adunare).users_solved_count, 2)
+
+    def test_compute_user_statistics(self):
+        adunare, scadere, inmultire = self.tasks
+        math = MethodTag.objects.create(tag_id='math', tag_name='Math')
+        adunare.tags.add(math, MethodTag.objects.create(tag_id='easy', tag_name='Easy'))
+        scadere.tags.add(math)
+        TaskStatistics.objects.create(task=adunare, difficulty_score=10)
+        TaskStatistics.objects.create(task=scadere, difficulty_score=20)
+        now = timezone.now()
+        self.submit('1', self.handles[0], adunare, 'WA', submitted_on=now)
+        self.submit('2', self.handles[0], adunare, 'AC', submitted_on=now)
+        self.submit('3', self.handles[0], scadere, 'AC', submitted_on=now)
+        self.submit('4', self.handles[0], inmultire, 'WA')
+        self.submit('5', self.handles[1], adunare, 'AC')
+
+        services.compute_user_statistics()
+        statistics = {stat.user: stat for stat in UserStatistics.objects.all()}
+        self.assertEqual([(stat.tasks_tried_count, stat.tasks_solved_count, stat.total_points, stat.rank)
+                          for stat in map(statistics.get, self.users)],
+                         [(3, 2, 30, 1), (1, 1, 10, 2)])
+        self.assertEqual(json.loads(statistics[self.users[0]].tag_stats), [
+            {'tag': 'Easy', 'solved_count': 1},
+            {'tag': 'Math', 'solved_count': 2},
+        ])
+        activity = json.loads(statistics[self.users[0]].activity)
+        self.assertEqual(len(activity), 36)
+        self.assertEqual(activity[-1], {'name': now.strftime('%b %y'),
+                                        'total_submission_count': 3,
+                                        'ac_submission_count': 2})
+        # Submissions older than 36 months are left out.
+        self.assertEqual(sum(item['total_submission_count'] for item in activity), 3)
+
+        # Nothing changed, so nothing is written (not even the ranks).
+        with mock.patch.object(services.log, 'info') as log_info:
+            services.compute_user_statistics()
+        self.assertIn('(0 changed)', log_info.call_args[0][0])
+
+    @mock.patch.object(services.multipliers, 'compute_task_and_user_ratings')
+    def test_update_statistics(self, compute_ratings):
+        adunare, scadere, inmultire = self.tasks
+        self.submit('1', self.handles[0], adunare, 'AC')
+        self.assertEqual(list(StaleUserStatistics.objects.values_list('user', flat=True)),
+                         [self.users[0].pk])
+        self.assertEqual(list(StaleTaskStatistics.objects.values_list('task', flat=True)),
+                         [adunare.pk])
+
+        services.update_statistics()
+        self.assertFalse(StaleUserStatistics.objects.exists())
+        self.assertFalse(StaleTaskStatistics.objects.exists())
+        self.assertEqual([(stat.user, stat.tasks_solved_count, stat.rank)
+                          for stat in UserStatistics.objects.all()], [(self.users[0], 1, 1)])
+        self.assertEqual([(stat.task, stat.users_solved_count)
+                          for stat in TaskStatistics.objects.all()], [(adunare, 1)])
+
+        # Equal ratings, so that the mean multiplier (and the scores of the full
+        # computation) stay the same as tasks are added.
+        compute_ratings.return_value = ({adunare.pk: 2., scadere.pk: 2.}, {})
+        services.compute_task_statistics()
+        services.compute_user_statistics()
+        # Only the stale statistics are recomputed, with the same difficulty
+        # scores as the full computation (the new task is unrated).
+        new_task = Task.objects.create(judge=adunare.judge, task_id='impartire')
+        self.submit('2', self.handles[1], adunare, 'AC')
+        self.submit('3', self.handles[1], new_task, 'AC')
+        # Claims, task upsert, user aggregates and upsert, ranks (within a savepoint).
+        with self.assertNumQueries(10):
+            services.update_statistics()
+        incremental = list(UserStatistics.objects.order_by('user')
+                           .values_list('user', 'total_points', 'rank'))
+        self.assertEqual(incremental, [(self.users[0].pk, 100, 2), (self.users[1].pk, 200, 1)])
+        self.assertEqual(TaskStatistics.objects.get(task=adunare).users_solved_count, 2)
+
+        services.compute_task_statistics()
+        services.compute_user_statistics()
+        self.assertEqual(list(UserStatistics.objects.order_by('user')
+                              .values_list('user', 'total_points', 'rank')), incremental)
 
-# Create your tests here.
+    def test_update_ranks(self):
+        user3 = User.objects.create_user(username='user3', password='12345').profile
+        statistics = [UserStatistics.objects.create(user=user, total_points=total_points)
+                      for user, total_points in zip(self.users + [user3], [10, 30, 10])]
+        with self.assertNumQueries(1):
+            self.assertEqual(services.queries.update_ranks(UserStatistics), 3)
+        self.assertEqual([UserStatistics.objects.get(pk=stat.pk).rank for stat in statistics],
+                         [2, 1, 2])
+        self.assertEqual(services.queries.update_ranks(UserStatistics), 0)
@@ -1,7 +1,8 @@
 from django.utils.datetime_safe import datetime
 from django.utils import timezone
 
-from data.models import Submission
+# The activity of the users spans this many months, up to the current one.
+ACTIVITY_MONTH_COUNT = 36
 
 
 def get_month_id_from_date(date):
@@ -13,40 +14,40 @@ def get_date_from_month_id(month_id, format="%b-%y"):
     return datetime(y, m + 1, 1).strftime(format)
 
 
-def build_tag_stats_dict(user):
-    solved_count_for_tag = {}
-    for submission in Submission.objects.best().filter(author__in=user.handles.all(), verdict='AC').all():
-        for tag in submission.task.tags.all():
-            solved_count_for_tag[tag] = solved_count_for_tag.get(tag, 0) + 1
-    tag_stats = [{"tag": tag.tag_name, "solved_count": solved_count}
-                for tag, solved_count in solved_count_for_tag.items()]
+def build_tag_stats_dict(solved_counts):
+    """
+    :param solved_counts: list of (tag name, solved count) tuples
+    (see stats.queries.get_solved_tag_counts())
+    """
+    tag_stats = [{"tag": tag_name, "solved_count": solved_count}
+                 for tag_name, solved_count in solved_counts]
 
     return tag_stats
 
 
-def build_activity_dict(user):
-    # Build activity object.
-    activity = {}
+def get_activity_start():
+    """
+    :return: the start of the first month in the activity of the users
+    """
+    y, m = divmod(get_month_id_from_date(timezone.now()) - ACTIVITY_MONTH_COUNT + 1, 12)
+    return timezone.make_aware(datetime(y, m + 1, 1))
 
+
+def build_activity_dict(submission_counts):
+    """
+    :param submission_counts: dict from month ids to (total, accepted)
+    submission counts (see stats.queries.get_monthly_activity())
+    """
     def get_activity_item(month_id):
-        return activity.get(month_id, {
+        total_submission_count, ac_submission_count = submission_counts.get(month_id, (0, 0))
+        return {
             'name': get_date_from_month_id(month_id, format='%b %y'),
-            'total_submission_count': 0,
-            'ac_submission_count': 0,
-        })
-
-    for submission in Submission.objects.filter(author__in=user.handles.all()).all():
-        month_id = get_month_id_from_date(submission.submitted_on)
-        activity_item = get_activity_item(month_id)
-        activity_item['total_submission_count'] += 1
-
-        if submission.verdict == 'AC':
-            activity_item['ac_submission_count'] += 1
-
-        activity[month_id] = activity_item
+            'total_submission_count': total_submission_count,
+            'ac_submission_count': ac_submission_count,
+        }
 
     month_id_end = get_month_id_from_date(timezone.now())
     activity = [get_activity_item(month_id)
-                for month_id in list(range(month_id_end - 36 + 1, month_id_end + 1))]
+                for month_id in list(range(month_id_end - ACTIVITY_MONTH_COUNT + 1, month_id_end + 1))]
 
     return activity